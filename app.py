@@ -5,14 +5,24 @@ Interactive web application for querying Overture Maps places data
 
 import streamlit as st
 import pandas as pd
-import time
+import numpy as np
+import html
+import io
+import json
 import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Optional
 import folium
-from folium.plugins import Draw
+from folium.plugins import Draw, FastMarkerCluster
+from folium.utilities import JsCode
 from streamlit_folium import st_folium
 
-from src.db_manager import get_db_manager
-from src.query_builder import OvertureQueryBuilder
+from src.db_manager import fetch_dataframe, get_db_manager
+from src.query_builder import QueryParams
 from src.validators import InputValidator
 from src.exporters import export_dataframe, ExporterFactory
 from src.constants import (
@@ -20,7 +30,10 @@ from src.constants import (
     COMMON_CATEGORIES,
     STATE_BBOXES,
     OVERTURE_CONFIG,
-    DEFAULT_SETTINGS
+    DEFAULT_SETTINGS,
+    MAP_SETTINGS,
+    POLL_SETTINGS,
+    QUERY_SETTINGS
 )
 
 # Page configuration
@@ -31,6 +44,95 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# State selector options (static, so built once at import rather than per rerun)
+STATE_OPTIONS = {f"{code} - {name}": code for code, name in sorted(US_STATES.items())}
+STATE_OPTION_LABELS = list(STATE_OPTIONS.keys())
+_default_state_label = f"{DEFAULT_SETTINGS['state']} - {US_STATES[DEFAULT_SETTINGS['state']]}"
+DEFAULT_STATE_INDEX = STATE_OPTION_LABELS.index(_default_state_label) if _default_state_label in STATE_OPTIONS else 0
+
+# Span thresholds in degrees (ascending) for the results map zoom: zoom 16
+# for spans up to 0.01, one level less past each threshold, down to 4
+ZOOM_SPAN_THRESHOLDS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50)
+
+# Result columns used by the map view
+MAP_COLUMNS = ('latitude', 'longitude', 'name', 'category', 'city', 'state')
+
+# Map marker color palette, cycled by category
+MARKER_COLORS = (
+    'red', 'blue', 'green', 'purple', 'orange', 'darkred',
+    'lightred', 'beige', 'darkblue', 'darkgreen', 'cadetblue',
+    'darkpurple', 'white', 'pink', 'lightblue', 'lightgreen',
+    'gray', 'black', 'lightgray'
+)
+
+# Getting-started panel shown before the first query
+WELCOME_MESSAGE = """
+👈 **Get Started** - Configure your query filters in the sidebar and click **Execute Query**.
+
+**🚀 Quick Start:**
+1. Select a **State/Region** or switch to **Map Search**
+2. Choose one or more **Place Categories** (e.g., hospital, restaurant)
+3. Click **🔍 Execute Query** to fetch data from Overture Maps
+
+**✨ Features:**
+- 🗺️ Filter by US state or custom bounding box
+- 📍 60+ common place categories + custom categories
+- 📊 Interactive data table and map visualization
+- 📥 Export to CSV, GeoJSON, KML, Parquet, or Shapefile
+"""
+
+# Popup content for individual map markers
+POPUP_TEMPLATE = """
+<div style="font-family: Arial; width: 200px;">
+    <h4 style="margin-bottom: 5px;">{name}</h4>
+    <hr style="margin: 5px 0;">
+    <b>Category:</b> {cat}<br>
+    <b>City:</b> {city}<br>
+    <b>State:</b> {state}<br>
+    <b>Coordinates:</b> {lat:.4f}, {lon:.4f}
+</div>
+"""
+
+# Binds each GeoJSON point's tooltip and popup from its feature properties
+MARKER_BINDINGS = JsCode("""
+function (feature, layer) {
+    layer.bindTooltip(feature.properties.name);
+    layer.bindPopup(feature.properties.popup, {maxWidth: 250});
+}
+""")
+
+
+def escape_html(value):
+    """
+    Escape text for marker popups, tooltips and the legend
+
+    Labels reach the browser as JSON strings that Leaflet inserts as HTML.
+    """
+    return html.escape(str(value))
+
+
+@dataclass(slots=True)
+class BGTask:
+    """State shared between the UI and the background query worker"""
+
+    future: Optional[Future] = None
+    status: str = 'idle'
+    results: Any = None
+    category_counts: Any = None
+    error: Optional[str] = None
+    start_time: Optional[float] = None
+    query: Optional[str] = None
+    connection: Any = None
+    cancelled: bool = False
+    cancel_start_time: Optional[float] = None
+    interrupt_called: bool = False
+    interrupt_error: Optional[str] = None
+    # Adaptive progress polling
+    poll_count: int = 0
+    poll_interval: float = POLL_SETTINGS['min_interval']
+    last_polled_status: Optional[str] = None
+
+
 # Initialize session state
 if 'query_results' not in st.session_state:
     st.session_state.query_results = None
@@ -38,17 +140,12 @@ if 'query_executed' not in st.session_state:
     st.session_state.query_executed = False
 if 'execution_time' not in st.session_state:
     st.session_state.execution_time = 0
+if 'results_version' not in st.session_state:
+    st.session_state.results_version = 0
 
 # Background task tracking
 if 'bg_task' not in st.session_state:
-    st.session_state.bg_task = {
-        'thread': None,
-        'status': 'idle',
-        'results': None,
-        'error': None,
-        'start_time': None,
-        'cancelled': False
-    }
+    st.session_state.bg_task = BGTask()
 if 'query_running' not in st.session_state:
     st.session_state.query_running = False
 
@@ -89,6 +186,15 @@ def render_header():
     st.divider()
 
 
+def _on_filter_type_change():
+    """Apply a filter type switch, or hold it for confirmation if results would be lost"""
+    new_filter_type = st.session_state.filter_type_radio
+    if st.session_state.query_executed and st.session_state.query_results is not None:
+        st.session_state.pending_filter_change = new_filter_type
+    else:
+        st.session_state.last_filter_type = new_filter_type
+
+
 def render_sidebar():
     """Render sidebar with filter controls"""
     st.sidebar.header("🔍 Query Filters")
@@ -103,38 +209,30 @@ def render_sidebar():
     st.sidebar.divider()
 
     # Filter type selection
-    filter_type = st.sidebar.radio(
+    st.sidebar.radio(
         "Filter Type",
         ["State/Region", "Map Search"],
         help="Choose how to filter places geographically",
         disabled=st.session_state.query_running,
-        key="filter_type_radio"
+        key="filter_type_radio",
+        on_change=_on_filter_type_change
     )
 
-    # Detect filter type change
-    if filter_type != st.session_state.last_filter_type:
-        # Check if we have results and need confirmation
-        if st.session_state.query_executed and st.session_state.query_results is not None:
-            st.session_state.pending_filter_change = filter_type
-            filter_type = st.session_state.last_filter_type  # Keep old selection temporarily
-        else:
-            st.session_state.last_filter_type = filter_type
+    # Effective filter type; stays on the old one while a change awaits confirmation
+    filter_type = st.session_state.last_filter_type
 
     state_filter = None
     bbox_filter = None
 
     # State filter
     if filter_type == "State/Region":
-        state_options = {f"{code} - {name}": code for code, name in sorted(US_STATES.items())}
-        default_state = f"{DEFAULT_SETTINGS['state']} - {US_STATES[DEFAULT_SETTINGS['state']]}"
-
         selected_state = st.sidebar.selectbox(
             "Select State",
-            options=list(state_options.keys()),
-            index=list(state_options.keys()).index(default_state) if default_state in state_options else 0,
+            options=STATE_OPTION_LABELS,
+            index=DEFAULT_STATE_INDEX,
             help="Choose a US state or territory"
         )
-        state_filter = state_options[selected_state]
+        state_filter = STATE_OPTIONS[selected_state]
 
     # Map-based search
     else:  # filter_type == "Map Search"
@@ -166,7 +264,8 @@ def render_sidebar():
 
     # Filter categories based on search term
     if search_term:
-        filtered_categories = [cat for cat in available_categories if search_term.lower() in cat.lower()]
+        needle = search_term.lower()
+        filtered_categories = [cat for cat in available_categories if needle in cat.lower()]
         if filtered_categories:
             st.sidebar.caption(f"Found {len(filtered_categories)} matching categories")
         else:
@@ -294,264 +393,384 @@ def validate_inputs(params):
     return len(errors) == 0, errors
 
 
+@st.cache_data(ttl=3600, show_spinner=False)
 def fetch_categories_from_overture():
     """
     Fetch official list of categories from Overture Maps schema CSV
 
+    Cached per process so new sessions don't re-download the list; failures
+    raise and are not cached.
+
     Returns:
         list: List of all official Overture Maps place categories (2000+)
     """
-    try:
-        import requests
+    import requests
+
+    # Official Overture Maps categories CSV from schema repository
+    categories_url = "https://raw.githubusercontent.com/OvertureMaps/schema/main/docs/schema/concepts/by-theme/places/overture_categories.csv"
 
-        # Official Overture Maps categories CSV from schema repository
-        categories_url = "https://raw.githubusercontent.com/OvertureMaps/schema/main/docs/schema/concepts/by-theme/places/overture_categories.csv"
+    response = requests.get(categories_url, timeout=10)
+    response.raise_for_status()
 
-        response = requests.get(categories_url, timeout=10)
-        response.raise_for_status()
+    # Parse CSV (semicolon-delimited, first column is category code)
+    lines = response.text.strip().split('\n')
+    categories = []
 
-        # Parse CSV (semicolon-delimited, first column is category code)
-        lines = response.text.strip().split('\n')
-        categories = []
+    for line in lines:
+        # Skip empty lines
+        if not line.strip():
+            continue
+        # Split by semicolon and take first column (category code)
+        parts = line.split(';')
+        if parts and parts[0].strip():
+            category = parts[0].strip()
+            categories.append(category)
 
-        for line in lines:
-            # Skip empty lines
-            if not line.strip():
-                continue
-            # Split by semicolon and take first column (category code)
-            parts = line.split(';')
-            if parts and parts[0].strip():
-                category = parts[0].strip()
-                categories.append(category)
+    if not categories:
+        raise ValueError("category list is empty")
 
-        # Remove duplicates and sort
-        categories = sorted(list(set(categories)))
+    # Remove duplicates and sort
+    return sorted(set(categories))
 
-        return categories if categories else COMMON_CATEGORIES
 
+def load_categories():
+    """
+    Official categories, falling back to the built-in list if the fetch fails
+
+    Returns:
+        list: Place categories
+    """
+    try:
+        return fetch_categories_from_overture()
     except Exception as e:
         st.warning(f"Could not fetch categories from Overture Maps schema: {str(e)}")
         return COMMON_CATEGORIES
 
 
-def execute_query(params, status_container=None):
+@st.cache_resource(show_spinner=False)
+def get_query_executor():
     """
-    Execute query with given parameters
+    Process-wide worker pool for background queries
+
+    Sessions submit to a small shared pool instead of each spawning its own
+    thread; DuckDB's blocking execute runs there while the UI keeps polling.
+
+    Returns:
+        ThreadPoolExecutor: Shared executor
+    """
+    return ThreadPoolExecutor(
+        max_workers=QUERY_SETTINGS['max_workers'],
+        thread_name_prefix="overture-query"
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_scan_slots():
+    """
+    Process-wide limit on concurrent S3 scans
+
+    Sessions share one semaphore so simultaneous queries queue instead of
+    competing for memory and S3 bandwidth.
+
+    Returns:
+        threading.BoundedSemaphore: Scan slots
+    """
+    return threading.BoundedSemaphore(QUERY_SETTINGS['max_concurrent_scans'])
+
+
+@st.cache_resource(ttl=3600, show_spinner=False)
+def probe_s3(release_version):
+    """
+    Verify S3 access for a release from a single file's metadata
+
+    Lists the release prefix and reads one Parquet footer instead of scanning
+    every file. Cached so this only happens once per release per process;
+    failures raise and are not cached.
 
     Args:
-        params (dict): Query parameters
-        status_container: Streamlit status container for progress updates
+        release_version (str): Overture release version
 
     Returns:
-        pd.DataFrame: Query results
+        bool: True once connectivity is confirmed
     """
-    def update_status(message):
-        """Helper to update status if container provided"""
-        if status_container:
-            status_container.update(label=message)
+    try:
+        base_path = f"s3://overturemaps-us-west-2/release/{release_version}/theme=places/type=place/*"
+        with get_db_manager().get_connection().cursor() as con:
+            first_file = con.execute("SELECT file FROM glob(?) LIMIT 1", [base_path]).fetchone()
+            if first_file is None:
+                raise FileNotFoundError(f"no Parquet files under {base_path}")
+            con.execute("SELECT 1 FROM parquet_metadata(?) LIMIT 1", [first_file[0]]).fetchone()
+        return True
+    except Exception as test_error:
+        raise Exception(f"S3 connection test failed: {str(test_error)}")
+
+
+def _warm_places_db(release_version):
+    """
+    Load extensions and bind the places view ahead of the first query
 
+    Args:
+        release_version (str): Overture release version
+    """
     try:
-        # Build query
-        update_status("Building SQL query...")
-        builder = OvertureQueryBuilder()
+        get_places_db(release_version)
+    except Exception:
+        # Nothing is cached on failure; the first real query retries and
+        # reports the problem to the user
+        pass
 
-        if params['categories']:
-            builder.add_categories(params['categories'])
 
-        if params['filter_type'] == "State/Region" and params['state']:
-            builder.add_state_filter(params['state'])
-        elif params['filter_type'] == "Map Search" and params['bbox']:
-            bbox = params['bbox']
-            builder.add_bbox_filter(bbox['xmin'], bbox['xmax'], bbox['ymin'], bbox['ymax'])
+@st.cache_resource(show_spinner=False)
+def start_db_warmup():
+    """
+    Warm the shared DuckDB connection in the background, once per process
 
-        if params['limit']:
-            builder.set_limit(params['limit'])
+    Extension loading, the S3 probe and view binding otherwise all land on
+    the first user's query. The view is created under the manager's lock,
+    so a query arriving mid-warmup waits for it instead of repeating it.
 
-        query = builder.build()
-        update_status("✓ SQL query built")
+    Returns:
+        concurrent.futures.Future: Warmup task
+    """
+    return get_query_executor().submit(_warm_places_db, OVERTURE_CONFIG['release'])
 
-        # Show query in expander for debugging
-        if status_container:
-            with st.expander("View SQL Query"):
-                st.code(query, language="sql")
 
-        # Initialize database connection
-        update_status("Initializing DuckDB...")
-        db_manager = get_db_manager()
-        update_status("✓ Getting database connection...")
+def get_places_db(release_version, on_status=None):
+    """
+    Get the shared DuckDB manager with the places view ready for a release
 
-        # Get connection
-        con = db_manager.get_connection()
-        update_status("✓ Database connection ready")
+    The S3 connectivity test and view creation only run when the release
+    changes; otherwise this is a cached lookup.
 
-        # Create view if needed
-        release_version = st.session_state.get('overture_release', OVERTURE_CONFIG['release'])
+    Args:
+        release_version (str): Overture release version
+        on_status (callable, optional): Receives progress messages
 
-        if not db_manager._view_created or db_manager._current_release != release_version:
-            update_status(f"Creating data view for release {release_version}...")
-            update_status("Testing S3 connectivity...")
+    Returns:
+        DuckDBManager: Manager with the places view created
+    """
+    def notify(message):
+        if on_status:
+            on_status(message)
 
-            # Test S3 access first with a simple query
-            try:
-                base_path = f"s3://overturemaps-us-west-2/release/{release_version}/theme=places/type=place/*"
-                test_query = f"SELECT COUNT(*) FROM read_parquet('{base_path}', filename=true, hive_partitioning=1) LIMIT 1"
-                con.execute(test_query).fetchone()
-                update_status("✓ S3 connectivity confirmed")
-            except Exception as test_error:
-                raise Exception(f"S3 connection test failed: {str(test_error)}")
+    db_manager = get_db_manager()
 
-            db_manager.create_places_view(release_version)
-            update_status("✓ Data view created")
+    if not db_manager.is_view_current(release_version):
+        notify(f"Creating data view for release {release_version}...")
 
-        # Execute query directly (skip count to avoid double scan)
-        update_status("Fetching results from S3...")
-        results = con.execute(query).fetchdf()
+        # Test S3 access first (proven once per release per process)
+        probe_s3(release_version)
+        notify("✓ S3 connectivity confirmed")
 
-        if results.empty:
-            update_status("⚠️ No results found with current filters")
-            return results
+        db_manager.create_places_view(release_version)
+        notify("✓ Data view created")
 
-        update_status(f"✓ Query complete - {len(results):,} results")
+    return db_manager
 
-        return results
 
-    except Exception as e:
-        error_msg = f"Error: {str(e)}"
-        if status_container:
-            status_container.update(label=f"❌ {error_msg}", state="error")
-        raise
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def fetch_query_results(query, release_version, query_params=(), _on_progress=None, _connection=None,
+                        _on_wait=None):
+    """
+    Run a SQL query against a release's places view and cache the results
 
+    Identical filters produce identical SQL, so repeated queries are served
+    from Streamlit's cache instead of re-scanning S3. The SQL names the
+    release's own view, so another session creating a view for a different
+    release can't change what this query reads.
 
-def execute_query_in_background(params, status_dict):
+    Args:
+        query (str): SQL query string, optionally with ? placeholders
+        release_version (str): Overture release the query runs against
+        query_params (tuple): Values bound to the query placeholders
+        _on_progress (callable, optional): Receives the running row count
+            while results stream in (excluded from the cache key)
+        _connection (optional): Cursor to run on instead of the shared
+            connection, so the caller can interrupt just this query
+        _on_wait (callable, optional): Called periodically while queued
+            behind other scans; may raise to give up
+
+    Returns:
+        pd.DataFrame: Query results
+    """
+    # Only cache misses get here, so cached results never wait for a slot
+    scan_slots = get_scan_slots()
+    while not scan_slots.acquire(timeout=0.5):
+        if _on_wait:
+            _on_wait()
+
+    try:
+        db_manager = get_places_db(release_version)
+        # The process-wide connection isn't safe to execute on from several
+        # threads at once; a cursor shares its database, view and settings
+        con = _connection if _connection is not None else db_manager.get_connection().cursor()
+        try:
+            result = con.execute(query, list(query_params))
+            return fetch_dataframe(result, on_progress=_on_progress)
+        finally:
+            if con is not _connection:
+                con.close()
+    finally:
+        scan_slots.release()
+
+
+def execute_query_in_background(params, task):
     """
     Execute DuckDB query in background thread (doesn't block main thread)
 
     Args:
-        params (dict): Query parameters
-        status_dict (dict): Shared dictionary for status tracking
+        params (QueryParams): Query parameters
+        task (BGTask): Shared task state for status tracking
     """
     try:
         # Check for cancellation before starting
-        if status_dict.get('cancelled', False):
-            status_dict['status'] = 'Cancelled'
-            status_dict['error'] = 'Query cancelled by user'
-            status_dict['results'] = None
+        if task.cancelled:
+            task.status = 'Cancelled'
+            task.error = 'Query cancelled by user'
+            task.results = None
             return
 
         # Update status
-        status_dict['status'] = 'Building SQL query...'
+        task.status = 'Building SQL query...'
 
         # Build query
-        builder = OvertureQueryBuilder()
-
-        if params['categories']:
-            builder.add_categories(params['categories'])
-
-        if params['filter_type'] == "State/Region" and params['state']:
-            builder.add_state_filter(params['state'])
-        elif params['filter_type'] == "Map Search" and params['bbox']:
-            bbox = params['bbox']
-            builder.add_bbox_filter(bbox['xmin'], bbox['xmax'], bbox['ymin'], bbox['ymax'])
+        builder = params.to_builder()
 
-        if params['limit']:
-            builder.set_limit(params['limit'])
+        # Rows without a point can't be mapped; drop them in the scan
+        builder.require_coordinates()
 
+        # Bound parameters for execution; inline SQL only for display
+        sql, sql_params = builder.build_parameterized()
         query = builder.build()
-        status_dict['query'] = query
-        status_dict['status'] = '✓ SQL query built'
+        task.query = query
+        task.status = '✓ SQL query built'
 
         # Check for cancellation after building query
-        if status_dict.get('cancelled', False):
-            status_dict['status'] = 'Cancelled'
-            status_dict['error'] = 'Query cancelled by user'
-            status_dict['results'] = None
+        if task.cancelled:
+            task.status = 'Cancelled'
+            task.error = 'Query cancelled by user'
+            task.results = None
             return
 
         # Initialize database connection
-        status_dict['status'] = 'Initializing DuckDB...'
+        task.status = 'Initializing DuckDB...'
         db_manager = get_db_manager()
 
-        # Get connection
-        con = db_manager.get_connection()
-        status_dict['connection'] = con  # Store connection for cancellation
-        status_dict['status'] = '✓ Database connection ready'
+        # Own cursor per query: interrupt() from the UI then aborts only this
+        # query, not others sharing the process-wide connection
+        con = db_manager.get_connection().cursor()
+        task.connection = con  # Store connection for cancellation
+        task.status = '✓ Database connection ready'
 
         # Check for cancellation before creating view
-        if status_dict.get('cancelled', False):
-            status_dict['status'] = 'Cancelled'
-            status_dict['error'] = 'Query cancelled by user'
-            status_dict['results'] = None
+        if task.cancelled:
+            task.status = 'Cancelled'
+            task.error = 'Query cancelled by user'
+            task.results = None
             return
 
         # Create view if needed
-        release_version = OVERTURE_CONFIG['release']
+        release_version = params.release or OVERTURE_CONFIG['release']
 
-        if not db_manager._view_created or db_manager._current_release != release_version:
-            status_dict['status'] = f'Creating data view for release {release_version}...'
+        def set_status(message):
+            task.status = message
 
-            # Test S3 access first
-            try:
-                base_path = f"s3://overturemaps-us-west-2/release/{release_version}/theme=places/type=place/*"
-                test_query = f"SELECT COUNT(*) FROM read_parquet('{base_path}', filename=true, hive_partitioning=1) LIMIT 1"
-                con.execute(test_query).fetchone()
-                status_dict['status'] = '✓ S3 connectivity confirmed'
-            except Exception as test_error:
-                raise Exception(f"S3 connection test failed: {str(test_error)}")
-
-            db_manager.create_places_view(release_version)
-            status_dict['status'] = '✓ Data view created'
+        get_places_db(release_version, on_status=set_status)
 
         # Final check for cancellation before executing main query
-        if status_dict.get('cancelled', False):
-            status_dict['status'] = 'Cancelled'
-            status_dict['error'] = 'Query cancelled by user'
-            status_dict['results'] = None
+        if task.cancelled:
+            task.status = 'Cancelled'
+            task.error = 'Query cancelled by user'
+            task.results = None
             return
 
         # Execute query (THIS is the blocking call, but only blocks THIS thread)
         # Can now be interrupted via connection.interrupt() from main thread
-        status_dict['status'] = 'Fetching results from S3...'
+        task.status = 'Fetching results from S3...'
+
+        def wait_for_scan_slot():
+            if task.cancelled:
+                raise RuntimeError('Query cancelled while queued')
+            task.status = 'Waiting for another query to finish...'
+
         try:
-            results = con.execute(query).fetchdf()
+            results = fetch_query_results(
+                sql, release_version, tuple(sql_params),
+                _on_progress=lambda rows: set_status(f'Fetching results from S3... {rows:,} rows received'),
+                _connection=con,
+                _on_wait=wait_for_scan_slot
+            )
         except Exception as query_error:
+            # interrupt() surfaces here as a DuckDB InterruptException
             # Check if this was an intentional interruption
-            if status_dict.get('cancelled', False):
-                status_dict['status'] = 'Cancelled'
-                status_dict['error'] = 'Query interrupted by user'
-                status_dict['results'] = None
+            if task.cancelled:
+                task.status = 'Cancelled'
+                task.error = 'Query interrupted by user'
+                task.results = None
                 return
             else:
                 # Re-raise actual errors to be caught by outer exception handler
                 raise
 
         # Check if cancelled while query was running
-        if status_dict.get('cancelled', False):
-            status_dict['status'] = 'Cancelled'
-            status_dict['error'] = 'Query cancelled by user'
-            status_dict['results'] = None
+        if task.cancelled:
+            task.status = 'Cancelled'
+            task.error = 'Query cancelled by user'
+            task.results = None
             return
 
         # Check if we got any results
-        if results.empty or len(results) == 0:
-            status_dict['status'] = 'No results found'
-            status_dict['error'] = 'no_results'  # Special error code
-            status_dict['results'] = None
+        if results.empty:
+            task.status = 'No results found'
+            task.error = 'no_results'  # Special error code
+            task.results = None
             return
 
+        # Summarize categories here so the first results render doesn't regroup
+        task.status = 'Summarizing categories...'
+        task.category_counts = results['category'].value_counts()
+
         # Store results
-        status_dict['results'] = results
-        status_dict['status'] = f'✓ Query complete - {len(results):,} results'
-        status_dict['error'] = None
+        task.results = results
+        task.status = f'✓ Query complete - {len(results):,} results'
+        task.error = None
 
     except Exception as e:
         # Check if error was due to cancellation
-        if status_dict.get('cancelled', False):
-            status_dict['status'] = 'Cancelled'
-            status_dict['error'] = 'Query cancelled by user'
+        if task.cancelled:
+            task.status = 'Cancelled'
+            task.error = 'Query cancelled by user'
         else:
-            status_dict['status'] = 'Error'
-            status_dict['error'] = str(e)
-        status_dict['results'] = None
+            task.status = 'Error'
+            task.error = str(e)
+        task.results = None
+    finally:
+        # Release the per-query cursor; cancel has nothing left to interrupt
+        if task.connection is not None:
+            task.connection.close()
+            task.connection = None
+
+
+def get_category_counts(df):
+    """
+    Category value counts, computed once per result set
+
+    The counts are kept in session state next to the DataFrame they came
+    from, so widget reruns reuse them instead of regrouping the column. The
+    query worker seeds them, so normally they are never computed on a rerun.
+
+    Args:
+        df (pd.DataFrame): Query results
+
+    Returns:
+        pd.Series: Counts per category, most common first
+    """
+    cached = st.session_state.get('category_counts')
+    # Identity check: holding the DataFrame reference means it can't be a stale match
+    if cached is None or cached[0] is not df or cached[1] is None:
+        cached = (df, df['category'].value_counts())
+        st.session_state.category_counts = cached
+    return cached[1]
 
 
 def render_results(df):
@@ -565,6 +784,9 @@ def render_results(df):
         st.warning("No results found. Try adjusting your filters.")
         return
 
+    # One pass over the category column serves both the metric and the chart
+    category_counts = get_category_counts(df)
+
     # Results summary
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -572,12 +794,10 @@ def render_results(df):
     with col2:
         st.metric("Execution Time", f"{st.session_state.execution_time:.2f}s")
     with col3:
-        unique_categories = df['category'].nunique()
-        st.metric("Unique Categories", unique_categories)
+        st.metric("Unique Categories", len(category_counts))
 
     # Category breakdown
     with st.expander("Category Breakdown"):
-        category_counts = df['category'].value_counts()
         st.bar_chart(category_counts)
 
     st.divider()
@@ -590,51 +810,56 @@ def render_results(df):
 
     st.divider()
 
-    # Tabs for Table and Map views (better for small screens)
-    tab1, tab2 = st.tabs(["📊 Data Table", "🗺️ Map View"])
+    # Tabs for Table and Map views (better for small screens). Tracking the
+    # selected tab makes them lazy: only the open tab's content is built
+    tab1, tab2 = st.tabs(["📊 Data Table", "🗺️ Map View"], key="results_view", on_change="rerun")
 
-    with tab1:
-        st.dataframe(
-            df,
-            use_container_width=True,
-            height=500
-        )
+    if tab1.open:
+        with tab1:
+            st.dataframe(
+                df,
+                use_container_width=True,
+                height=500
+            )
 
-    with tab2:
-        render_map(df)
+    if tab2.open:
+        with tab2:
+            render_map(df)
 
 
+@st.fragment
 def render_map_search_interface():
     """
     Render full-width map search interface in main content area with interactive drawing
 
+    Runs as a fragment so drawing, panning and preset clicks only rerun the
+    map block; the sidebar picks up map_bounds on the next full run.
+
     Returns:
         dict: Updated bbox_filter from map interaction
     """
     st.subheader("🗺️ Map Search - Draw Your Search Area")
 
-    current_bbox = st.session_state.map_bounds
-
     # Quick presets for common areas
     col_preset1, col_preset2, col_preset3 = st.columns(3)
     with col_preset1:
         if st.button("📍 Nashville, TN", use_container_width=True, help="Small area for quick testing"):
             st.session_state.map_bounds = STATE_BBOXES['TN']
-            st.rerun()
     with col_preset2:
         if st.button("🌆 New York City", use_container_width=True):
             st.session_state.map_bounds = {
                 'xmin': -74.3, 'xmax': -73.7,
                 'ymin': 40.5, 'ymax': 40.9
             }
-            st.rerun()
     with col_preset3:
         if st.button("🌁 San Francisco", use_container_width=True):
             st.session_state.map_bounds = {
                 'xmin': -122.5, 'xmax': -122.3,
                 'ymin': 37.7, 'ymax': 37.85
             }
-            st.rerun()
+
+    # Read after the presets so a click takes effect in this same run
+    current_bbox = st.session_state.map_bounds
 
     st.divider()
 
@@ -692,11 +917,13 @@ def render_map_search_interface():
     st.markdown("**🖍️ Draw a rectangle on the map to define your search area**")
     st.caption("Use the rectangle tool (□) in the top-left corner of the map. Click 'Execute Query' in the sidebar after drawing.")
 
+    # Only the drawn shapes come back; clicks, pans and zooms change nothing
+    # returned, so they don't trigger a rerun
     map_data = st_folium(
         m,
         width=None,
         height=500,
-        returned_objects=["all_drawings", "last_active_drawing"]
+        returned_objects=["all_drawings"]
     )
 
     st.divider()
@@ -710,21 +937,13 @@ def render_map_search_interface():
             if last_drawing['geometry']['type'] == 'Polygon':
                 coords = last_drawing['geometry']['coordinates'][0]
                 # Extract bounding box from polygon coordinates
-                lons = [c[0] for c in coords]
-                lats = [c[1] for c in coords]
-
-                new_bbox = {
-                    'xmin': min(lons),
-                    'xmax': max(lons),
-                    'ymin': min(lats),
-                    'ymax': max(lats)
-                }
+                new_bbox = bbox_from_coordinates(coords)
 
                 # Update if different from current
                 if new_bbox != st.session_state.map_bounds:
                     st.session_state.map_bounds = new_bbox
+                    current_bbox = new_bbox
                     st.success("✅ Search area updated from drawing!")
-                    st.rerun()
 
     # Manual bounding box entry (fallback)
     with st.expander("📐 Or Enter Coordinates Manually"):
@@ -804,6 +1023,27 @@ def render_map_search_interface():
     return st.session_state.map_bounds
 
 
+def bbox_from_coordinates(coords):
+    """
+    Compute the bounding box of a polygon ring
+
+    Args:
+        coords (list): [lon, lat] pairs from a GeoJSON polygon
+
+    Returns:
+        dict: Bounding box with xmin, xmax, ymin, ymax
+    """
+    # Column-wise min/max on one float array instead of per-axis Python loops
+    points = np.asarray(coords, dtype=np.float64)[:, :2]
+    (xmin, ymin), (xmax, ymax) = points.min(axis=0), points.max(axis=0)
+    return {
+        'xmin': float(xmin),
+        'xmax': float(xmax),
+        'ymin': float(ymin),
+        'ymax': float(ymax)
+    }
+
+
 def calculate_zoom_level(min_lat, max_lat, min_lon, max_lon):
     """
     Calculate appropriate zoom level based on bounding box size
@@ -821,136 +1061,270 @@ def calculate_zoom_level(min_lat, max_lat, min_lon, max_lon):
     # Use the larger span to determine zoom
     max_span = max(lat_span, lon_span)
 
-    # Map span to zoom level (approximate)
-    if max_span > 50:
-        return 4
-    elif max_span > 20:
-        return 5
-    elif max_span > 10:
-        return 6
-    elif max_span > 5:
-        return 7
-    elif max_span > 2:
-        return 8
-    elif max_span > 1:
-        return 9
-    elif max_span > 0.5:
-        return 10
-    elif max_span > 0.2:
-        return 11
-    elif max_span > 0.1:
-        return 12
-    elif max_span > 0.05:
-        return 13
-    elif max_span > 0.02:
-        return 14
-    elif max_span > 0.01:
-        return 15
-    else:
-        return 16
+    # Zoom drops one level for each threshold the span exceeds
+    return 16 - bisect_left(ZOOM_SPAN_THRESHOLDS, max_span)
+
+
+def get_map_points(df):
+    """
+    Rows and columns drawn on the results map, selected once per result set
 
+    Kept in session state next to the DataFrame they came from (like the
+    category counts), so reruns with the map open don't rescan the results.
 
+    Args:
+        df (pd.DataFrame): Query results with lat/lon
+
+    Returns:
+        tuple: (pd.DataFrame of the points to draw, int total mappable points)
+    """
+    cached = st.session_state.get('map_points')
+    if cached is None or cached[0] is not df:
+        # Mask rows with missing coordinates instead of dropna(), so only the
+        # rows and columns actually drawn get copied out of the result set
+        has_coords = (df['latitude'].notna() & df['longitude'].notna()).to_numpy()
+        total_points = int(has_coords.sum())
+
+        # Individual markers each become a Leaflet layer; past the marker limit,
+        # switch to a client-side cluster fed by one coordinate array
+        use_cluster = total_points > MAP_SETTINGS['marker_limit']
+        max_points = MAP_SETTINGS['cluster_limit'] if use_cluster else MAP_SETTINGS['marker_limit']
+        display_rows = np.flatnonzero(has_coords)[:max_points]
+        display_columns = df.columns.get_indexer([c for c in MAP_COLUMNS if c in df.columns])
+
+        cached = (df, df.iloc[display_rows, display_columns], total_points)
+        st.session_state.map_points = cached
+    return cached[1], cached[2]
+
+
+@st.fragment
 def render_map(df):
     """
     Render interactive map with results using Folium
+    Runs as a fragment so map interactions don't rerun the whole app
 
     Args:
         df (pd.DataFrame): Query results with lat/lon
     """
     st.subheader("Map View")
-    st.caption("Displaying up to 1,000 points for optimal performance")
+    st.caption(
+        f"Up to {MAP_SETTINGS['marker_limit']:,} points are drawn individually; "
+        f"larger results are clustered (up to {MAP_SETTINGS['cluster_limit']:,})"
+    )
 
     if df.empty or 'latitude' not in df.columns or 'longitude' not in df.columns:
         st.info("No location data available for mapping")
         return
 
-    # Remove rows with missing coordinates
-    df_map = df.dropna(subset=['latitude', 'longitude'])
+    df_display, total_points = get_map_points(df)
 
-    if df_map.empty:
+    if total_points == 0:
         st.info("No valid coordinates found in results")
         return
 
-    # Limit to first 1000 for performance (Folium can be slower with many markers)
-    max_points = 1000
-    df_display = df_map.head(max_points)
+    use_cluster = total_points > MAP_SETTINGS['marker_limit']
+    max_points = MAP_SETTINGS['cluster_limit'] if use_cluster else MAP_SETTINGS['marker_limit']
 
-    if len(df_map) > max_points:
-        st.warning(f"⚠️ Showing first {max_points:,} of {len(df_map):,} points on map", icon="⚠️")
+    if total_points > max_points:
+        st.warning(f"⚠️ Showing first {max_points:,} of {total_points:,} points on map", icon="⚠️")
+
+    # Coordinate arrays are shared by the center/extent math and the markers
+    lats = df_display['latitude'].to_numpy(dtype=float)
+    lons = df_display['longitude'].to_numpy(dtype=float)
 
     # Calculate map center and bounds
-    center_lat = df_display['latitude'].mean()
-    center_lon = df_display['longitude'].mean()
+    center_lat = lats.mean()
+    center_lon = lons.mean()
 
     # Get bounding box for all points
-    min_lat = df_display['latitude'].min()
-    max_lat = df_display['latitude'].max()
-    min_lon = df_display['longitude'].min()
-    max_lon = df_display['longitude'].max()
+    min_lat, max_lat = lats.min(), lats.max()
+    min_lon, max_lon = lons.min(), lons.max()
 
     # Calculate appropriate zoom level based on data extent
     zoom_level = calculate_zoom_level(min_lat, max_lat, min_lon, max_lon)
 
-    # Create Folium map with calculated zoom (instead of fit_bounds)
+    # Create Folium map with calculated zoom (instead of fit_bounds); circle
+    # markers draw onto one shared canvas rather than one SVG node each
     m = folium.Map(
         location=[center_lat, center_lon],
         tiles='OpenStreetMap',
-        zoom_start=zoom_level
+        zoom_start=zoom_level,
+        prefer_canvas=True
     )
 
-    # Define color mapping for categories
-    unique_categories = df_display['category'].unique()
-    colors = ['red', 'blue', 'green', 'purple', 'orange', 'darkred',
-              'lightred', 'beige', 'darkblue', 'darkgreen', 'cadetblue',
-              'darkpurple', 'white', 'pink', 'lightblue', 'lightgreen',
-              'gray', 'black', 'lightgray']
-    category_colors = {cat: colors[i % len(colors)] for i, cat in enumerate(unique_categories)}
-
-    # Add markers for each location
-    for idx, row in df_display.iterrows():
-        # Create popup content
-        popup_html = f"""
-        <div style="font-family: Arial; width: 200px;">
-            <h4 style="margin-bottom: 5px;">{row.get('name', 'Unknown')}</h4>
-            <hr style="margin: 5px 0;">
-            <b>Category:</b> {row.get('category', 'N/A')}<br>
-            <b>City:</b> {row.get('city', 'N/A')}<br>
-            <b>State:</b> {row.get('state', 'N/A')}<br>
-            <b>Coordinates:</b> {row['latitude']:.4f}, {row['longitude']:.4f}
-        </div>
-        """
+    # Factorize categories once: codes drive per-row colors, uniques drive the
+    # legend (same order as unique(), missing categories included)
+    cat_codes, unique_categories = pd.factorize(df_display['category'], use_na_sentinel=False)
+
+    # Color lookup table indexed by category code (palette cycles past its length)
+    palette = np.asarray(MARKER_COLORS)
+    category_colors = palette[np.arange(len(unique_categories)) % len(palette)]
+
+    # Place names and addresses end up inside popup/tooltip HTML, so they are
+    # escaped; each distinct value is escaped once, then gathered per row
+    def display_labels(uniques, default):
+        return np.array(
+            [default if pd.isna(value) else escape_html(value) for value in uniques],
+            dtype=object
+        )
 
-        folium.CircleMarker(
-            location=[row['latitude'], row['longitude']],
-            radius=6,
-            popup=folium.Popup(popup_html, max_width=250),
-            tooltip=row.get('name', 'Unknown'),
-            color=category_colors.get(row.get('category'), 'gray'),
-            fillColor=category_colors.get(row.get('category'), 'gray'),
-            fillOpacity=0.7,
-            weight=2
+    def column_labels(column, default):
+        if column not in df_display.columns:
+            return np.full(len(df_display), default, dtype=object)
+        codes, uniques = pd.factorize(df_display[column], use_na_sentinel=False)
+        return display_labels(uniques, default)[codes]
+
+    category_labels = display_labels(unique_categories, 'N/A')
+    names = column_labels('name', 'Unknown')
+    cats = category_labels[cat_codes]
+
+    # Map each row to its category color with a single gather
+    marker_colors = category_colors[cat_codes]
+
+    if use_cluster:
+        # One row per point, built column-wise instead of per-row lists. Rows
+        # carry a category code instead of the label and color strings, and
+        # coordinates are rounded to ~1 m: folium re-parses the serialized data
+        # as a template, so its size drives the render time
+        cluster_data = np.column_stack([
+            np.round(lats, 5), np.round(lons, 5), names, cat_codes
+        ]).tolist()
+        cluster_callback = """
+        (function () {
+            var labels = %s;
+            var colors = %s;
+            return function (row) {
+                var color = colors[row[3]];
+                var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+                    radius: 6, color: color, fillColor: color, fillOpacity: 0.7, weight: 2
+                });
+                marker.bindTooltip(row[2]);
+                marker.bindPopup('<b>' + row[2] + '</b><br><b>Category:</b> ' + labels[row[3]]);
+                return marker;
+            };
+        })();
+        """ % (json.dumps(category_labels.tolist()), json.dumps(category_colors.tolist()))
+        FastMarkerCluster(data=cluster_data, callback=cluster_callback).add_to(m)
+    else:
+        cities = column_labels('city', 'N/A')
+        states = column_labels('state', 'N/A')
+
+        # Fill the popup template in one pass before creating markers
+        format_popup = POPUP_TEMPLATE.format
+        popups = [
+            format_popup(name=name, cat=cat, city=city, state=state, lat=lat, lon=lon)
+            for name, cat, city, state, lat, lon in zip(names, cats, cities, states, lats, lons)
+        ]
+
+        # One GeoJSON layer instead of a CircleMarker per row: folium renders
+        # a single JSON blob, and each point is styled from its properties
+        # (feature.properties.style) and bound to its popup in the browser
+        features = [
+            {
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+                'properties': {
+                    'name': name,
+                    'popup': popup_html,
+                    'style': {'color': color, 'fillColor': color}
+                }
+            }
+            for lat, lon, name, color, popup_html
+            in zip(lats.tolist(), lons.tolist(), names.tolist(), marker_colors.tolist(), popups)
+        ]
+        folium.GeoJson(
+            {'type': 'FeatureCollection', 'features': features},
+            marker=folium.CircleMarker(radius=6, fill=True, fill_opacity=0.7, weight=2),
+            on_each_feature=MARKER_BINDINGS
         ).add_to(m)
 
     # Add a legend
     if len(unique_categories) <= 10:  # Only show legend if not too many categories
-        legend_html = """
+        legend_items = "".join(
+            f'<p style="margin: 5px 0;"><i class="fa fa-circle" style="color:{color}"></i> {cat}</p>'
+            for cat, color in zip(category_labels[:10], category_colors)  # Limit to 10 categories
+        )
+        legend_html = f"""
         <div style="position: fixed;
                     bottom: 50px; right: 50px; width: 200px; height: auto;
                     background-color: white; z-index:9999; font-size:14px;
                     border:2px solid grey; border-radius: 5px; padding: 10px">
         <h4 style="margin-top: 0;">Categories</h4>
+        {legend_items}
+        </div>
         """
-        for cat in unique_categories[:10]:  # Limit to 10 categories
-            color = category_colors[cat]
-            legend_html += f'<p style="margin: 5px 0;"><i class="fa fa-circle" style="color:{color}"></i> {cat}</p>'
-        legend_html += "</div>"
         m.get_root().html.add_child(folium.Element(legend_html))
 
-    # Display map
-    st_folium(m, width=None, height=600, returned_objects=[])
+    # Display map. st_folium renders the map itself before serializing it; its
+    # default extra root render produces identical output at twice the cost.
+    # Keyed per result set so unrelated reruns reuse the mounted component
+    st_folium(
+        m,
+        key=f"results_map_{st.session_state.results_version}",
+        width=None,
+        height=600,
+        returned_objects=[],
+        render=False
+    )
+
+
+def _export_cache_for(df):
+    """Session export cache, reset whenever the result set changes"""
+    cache = st.session_state.get('export_cache')
+    # Identity check: holding the DataFrame reference means it can't be a stale match
+    if cache is None or cache['df'] is not df:
+        cache = {'df': df, 'exports': {}}
+        st.session_state.export_cache = cache
+    return cache
+
+
+def is_export_cached(df, export_format):
+    """
+    Check whether an export of this result set and format is already built
+
+    Args:
+        df (pd.DataFrame): Data to export
+        export_format (str): Export format
+
+    Returns:
+        bool: True if get_cached_export() won't need to serialize
+    """
+    return export_format in _export_cache_for(df)['exports']
+
+
+def get_cached_export(df, export_format):
+    """
+    Export a DataFrame, reusing earlier output for the same data and format
+
+    Args:
+        df (pd.DataFrame): Data to export
+        export_format (str): Export format
+
+    Returns:
+        tuple: (buffer, mime_type, file_extension, size_bytes)
+    """
+    exports = _export_cache_for(df)['exports']
+    if export_format not in exports:
+        buffer, mime_type, extension = export_dataframe(df, export_format)
+        # Measured once here; afterwards only the download callback reads it
+        size_bytes = buffer.seek(0, io.SEEK_END)
+        buffer.seek(0)
+        exports[export_format] = (buffer, mime_type, extension, size_bytes)
+    return exports[export_format]
+
+
+def read_export(buffer):
+    """Full contents of an export buffer, for a deferred download"""
+    buffer.seek(0)
+    return buffer.read()
 
 
-@st.dialog("Export Data")
+def _close_export_dialog():
+    """Forget the open export dialog so the next full run doesn't reopen it"""
+    st.session_state.show_export_dialog = False
+
+
+@st.dialog("Export Data", on_dismiss=_close_export_dialog)
 def show_export_dialog(df):
     """
     Modal dialog for exporting data
@@ -988,18 +1362,25 @@ def show_export_dialog(df):
             st.rerun()
 
     with col_exp2:
-        if st.button("Export", type="primary", width="stretch", key="export_confirm"):
+        export_clicked = st.button("Export", type="primary", width="stretch", key="export_confirm")
+
+        # Keep offering an export that was already built (e.g. after the download click reruns)
+        if export_clicked or is_export_cached(df, export_format):
             try:
+                # Only the serialization itself runs under the spinner
                 with st.spinner(f"Preparing {export_format.upper()} export..."):
-                    buffer, mime_type, extension = export_dataframe(df, export_format)
-                    filename = f"{filename_base}.{extension}"
-                    file_size_kb = len(buffer.getvalue()) / 1024
+                    buffer, mime_type, extension, size_bytes = get_cached_export(df, export_format)
+
+                filename = f"{filename_base}.{extension}"
+                file_size_kb = size_bytes / 1024
 
                 st.success(f"✅ Export ready! ({len(df):,} rows, {file_size_kb:.1f} KB)")
 
+                # Deferred: the bytes are read only when the button is clicked,
+                # not copied into Streamlit's media store on every rerun
                 st.download_button(
                     label=f"📥 Download {filename}",
-                    data=buffer.getvalue(),
+                    data=partial(read_export, buffer),
                     file_name=filename,
                     mime=mime_type,
                     width="stretch",
@@ -1009,29 +1390,282 @@ def show_export_dialog(df):
                 st.error(f"Export failed: {str(e)}")
 
 
+def clear_bg_task():
+    """
+    Mark the query as finished and start from a fresh idle task
+
+    A new object is swapped in rather than resetting the old one, so a worker
+    that is still unwinding after a forced stop can't write into it.
+    """
+    st.session_state.update(query_running=False, bg_task=BGTask())
+
+
+def clear_results():
+    """Drop the loaded results and everything derived from them in one state update"""
+    st.session_state.update({
+        'query_results': None,
+        'category_counts': None,
+        'map_points': None,
+        'export_cache': None,
+        'query_executed': False,
+    })
+
+
+def _apply_filter_change():
+    """Clear results and switch to the pending filter type"""
+    clear_results()
+    st.session_state.last_filter_type = st.session_state.pending_filter_change
+    st.session_state.pending_filter_change = None
+
+
+def _keep_current_filter():
+    """Drop the pending change and put the radio back on the current filter type"""
+    st.session_state.filter_type_radio = st.session_state.last_filter_type
+    st.session_state.pending_filter_change = None
+
+
+@st.dialog("Confirm Filter Change", dismissible=False)
+def confirm_filter_change_dialog(result_count):
+    """
+    Modal confirmation before a filter type switch clears loaded results
+
+    Args:
+        result_count (int): Number of results currently loaded
+    """
+    st.warning(f"""
+    **⚠️ Filter Type Change Detected**
+
+    You currently have **{result_count:,} results** loaded.
+    Switching from **{st.session_state.last_filter_type}** to **{st.session_state.pending_filter_change}** will clear these results.
+    """)
+
+    col_conf1, col_conf2 = st.columns([1, 1])
+    with col_conf1:
+        st.button("✅ Yes, Switch Filter", type="primary", width="stretch",
+                  key="filter_change_confirm", on_click=_apply_filter_change)
+    with col_conf2:
+        st.button("❌ Cancel", width="stretch",
+                  key="filter_change_cancel", on_click=_keep_current_filter)
+
+
+def cancel_background_query():
+    """Flag the running query as cancelled and interrupt DuckDB"""
+    bg_task = st.session_state.bg_task
+    bg_task.cancelled = True
+    bg_task.cancel_start_time = time.monotonic()
+
+    # Drops the job outright if it is still queued for a worker
+    if bg_task.future is not None:
+        bg_task.future.cancel()
+
+    if bg_task.connection is not None:
+        try:
+            bg_task.connection.interrupt()
+            bg_task.interrupt_called = True
+        except Exception as e:
+            bg_task.interrupt_error = str(e)
+
+
+def query_poll_interval(poll_count):
+    """
+    Adaptive progress polling interval
+
+    Starts fast so short queries surface quickly, then doubles every few
+    polls up to the cap so long queries don't poll needlessly.
+
+    Args:
+        poll_count (int): Polls since the status last changed
+
+    Returns:
+        float: Seconds until the next poll
+    """
+    return min(POLL_SETTINGS['max_interval'],
+               POLL_SETTINGS['min_interval'] * 2 ** (poll_count // POLL_SETTINGS['polls_per_step']))
+
+
+def render_query_progress():
+    """
+    Live progress for the background query
+
+    Runs as a fragment so each poll only re-executes this block; once the
+    worker thread finishes, a full app rerun processes the results.
+    """
+    # run_every is fixed when the fragment is registered, so it is registered
+    # with the current interval on each full run
+    interval = st.session_state.bg_task.poll_interval
+    st.fragment(run_every=interval)(_query_progress_body)()
+
+
+def _query_progress_body():
+    """Progress content rendered on every poll of the progress fragment"""
+    bg_task = st.session_state.bg_task
+    future = bg_task.future
+
+    if future is None or future.done():
+        st.rerun(scope="app")
+
+    # Back off while the status is unchanged; start over when it moves
+    if bg_task.status != bg_task.last_polled_status:
+        bg_task.last_polled_status = bg_task.status
+        bg_task.poll_count = 0
+    else:
+        bg_task.poll_count = bg_task.poll_count + 1
+
+    interval = query_poll_interval(bg_task.poll_count)
+    if interval != bg_task.poll_interval:
+        # Re-register the fragment with the new interval
+        bg_task.poll_interval = interval
+        st.rerun(scope="app")
+
+    # One clock read per poll; monotonic so NTP adjustments can't skew elapsed times
+    now = time.monotonic()
+
+    # Check if cancellation was requested
+    if bg_task.cancelled:
+        # Check how long we've been waiting for cancellation
+        if bg_task.cancel_start_time is None:
+            bg_task.cancel_start_time = now
+
+        cancel_elapsed = now - bg_task.cancel_start_time
+
+        # If thread still alive after 3 seconds, force cleanup
+        if cancel_elapsed > 3.0:
+            st.warning(f"""
+            ⚠️ **Query Interrupted** ({cancel_elapsed:.1f}s)
+
+            The query was interrupted but DuckDB is still cleaning up. Forcing stop now.
+            """)
+            # Force cleanup
+            clear_bg_task()
+            st.rerun(scope="app")
+
+        # Show cancelling message
+        st.markdown("### ⏸️ Cancelling Query...")
+        st.info(f"""
+        **Query cancellation in progress...** ({cancel_elapsed:.1f}s)
+
+        The running query has been interrupted. Waiting for cleanup...
+        """)
+        return
+
+    # Thread still running - show live progress
+    elapsed = now - bg_task.start_time
+    current_status = bg_task.status
+
+    st.markdown(f"#### 🔄 Query Running... {elapsed:.0f}s elapsed")
+
+    # Show minimalist progress info
+    col_prog1, col_prog2 = st.columns([3, 1])
+    with col_prog1:
+        st.info(f"**{current_status}**")
+    with col_prog2:
+        st.metric("Elapsed", f"{elapsed:.0f}s")
+
+    # Progress bar
+    progress_value = min(elapsed / 60.0, 0.95)
+    st.progress(progress_value)
+
+    # Show query if available (collapsed by default to reduce redraw)
+    if bg_task.query:
+        with st.expander("📋 View SQL Query"):
+            st.code(bg_task.query, language="sql")
+
+    # Stable key: the fragment reruns in place, so the button persists across polls
+    if st.button("❌ Cancel Query", key="cancel_btn_progress"):
+        cancel_background_query()
+        st.rerun(scope="app")
+
+    st.caption(f"💡 Refreshing every {bg_task.poll_interval:g}s")
+
+
+@st.fragment
+def render_welcome():
+    """Static getting-started panel shown before any query has run"""
+    st.info(WELCOME_MESSAGE)
+
+
+def collect_finished_query():
+    """Move a finished background query's outcome into session state and report it"""
+    bg_task = st.session_state.bg_task
+    elapsed = time.monotonic() - bg_task.start_time
+
+    # Check if cancelled
+    if bg_task.cancelled:
+        st.warning(f"⚠️ Query cancelled by user after {elapsed:.1f}s")
+        clear_bg_task()
+        return
+
+    # Check for errors
+    if bg_task.error:
+        error_msg = bg_task.error
+
+        # Reset task state first to clear "query in progress" message
+        clear_bg_task()
+
+        # Handle no results specially
+        if error_msg == 'no_results':
+            st.warning(f"""
+            **ℹ️ No Results Found** ({elapsed:.1f}s)
+
+            Your query didn't return any results. Try adjusting your filters:
+            - Select a different state or expand your bounding box
+            - Choose different categories
+            - Increase the result limit
+            - Check that your filters aren't too restrictive
+
+            The query completed successfully, but no places matched your criteria.
+            """)
+        else:
+            # Regular error
+            st.error(f"❌ Query failed: {error_msg}")
+        return
+
+    # Success - store results; they render further down in this same run
+    results = bg_task.results
+    st.session_state.update({
+        'query_results': results,
+        'query_executed': True,
+        'execution_time': elapsed,
+        'results_version': st.session_state.results_version + 1,
+        # Seed the per-result cache read by get_category_counts()
+        'category_counts': (results, bg_task.category_counts),
+    })
+    clear_bg_task()
+
+    st.success(f"✅ Query completed! Found {len(results):,} results in {elapsed:.2f}s")
+
+
 def main():
     """Main application function"""
 
     # Render header
     render_header()
 
+    # Start binding the places view while the user sets up their first query
+    if QUERY_SETTINGS['prewarm_on_start']:
+        start_db_warmup()
+
     # Auto-load categories from Overture Maps on first session
     if not st.session_state.categories_auto_loaded:
-        # Show loading banner
-        st.info("🔄 **Loading live categories from Overture Maps...** Please wait while we fetch the latest place categories.", icon="ℹ️")
-
-        # Progress indicator
-        progress_placeholder = st.empty()
-        with progress_placeholder:
+        # Banner and spinner share one placeholder, cleared once loading is done,
+        # so this run carries on to the sidebar without a pause or extra rerun
+        loading_placeholder = st.empty()
+        with loading_placeholder.container():
+            st.info("🔄 **Loading live categories from Overture Maps...** Please wait while we fetch the latest place categories.", icon="ℹ️")
             with st.spinner("Downloading official category list from Overture Maps..."):
-                categories = fetch_categories_from_overture()
-                st.session_state.dynamic_categories = categories
+                categories = load_categories()
+                # Stored once as an immutable tuple; the sidebar reads it as-is on every rerun
+                st.session_state.dynamic_categories = tuple(categories)
                 st.session_state.categories_auto_loaded = True
+        loading_placeholder.empty()
+
+        st.toast(f"✅ Loaded {len(categories)} official categories from Overture Maps!")
 
-        # Show success message briefly
-        progress_placeholder.success(f"✅ Loaded {len(categories)} official categories from Overture Maps!")
-        time.sleep(1.5)
-        st.rerun()
+    # Settle a finished background query before the sidebar reads query_running,
+    # so results render in this same run instead of after an extra rerun
+    if st.session_state.query_running and st.session_state.bg_task.future is not None:
+        if st.session_state.bg_task.future.done():
+            collect_finished_query()
 
     # Render sidebar and get parameters
     params = render_sidebar()
@@ -1059,14 +1693,7 @@ def main():
                 )
             with col_cancel:
                 if st.button("❌ Cancel", use_container_width=True, key="cancel_btn_footer"):
-                    st.session_state.bg_task['cancelled'] = True
-                    st.session_state.bg_task['cancel_start_time'] = time.time()
-                    if 'connection' in st.session_state.bg_task:
-                        try:
-                            st.session_state.bg_task['connection'].interrupt()
-                            st.session_state.bg_task['interrupt_called'] = True
-                        except Exception as e:
-                            st.session_state.bg_task['interrupt_error'] = str(e)
+                    cancel_background_query()
                     st.rerun()
             execute_button = False
         else:
@@ -1082,8 +1709,7 @@ def main():
             # Show clear results button if results exist
             if st.session_state.query_executed and st.session_state.query_results is not None:
                 if st.sidebar.button("🗑️ Clear Results", use_container_width=True, key="clear_results_btn"):
-                    st.session_state.query_results = None
-                    st.session_state.query_executed = False
+                    clear_results()
                     st.session_state.category_reset_counter += 1  # Reset category selection
                     st.rerun()
 
@@ -1099,195 +1725,41 @@ def main():
             return
 
         # Reset background task state
-        st.session_state.bg_task = {
-            'thread': None,
-            'status': 'Starting query...',
-            'results': None,
-            'error': None,
-            'start_time': time.time(),
-            'query': None,
-            'cancelled': False
-        }
+        # New object per run so a lingering worker can't write into it
+        st.session_state.bg_task = BGTask(status='Starting query...', start_time=time.monotonic())
         st.session_state.query_running = True
 
-        # Start background thread
-        thread = threading.Thread(
-            target=execute_query_in_background,
-            args=(params, st.session_state.bg_task),
-            daemon=True
+        # Freeze the filters so the worker thread gets an immutable snapshot
+        query_params = QueryParams.from_filters(
+            params,
+            release=st.session_state.get('overture_release', OVERTURE_CONFIG['release'])
         )
-        thread.start()
-        st.session_state.bg_task['thread'] = thread
-
-    # Handle background query execution
-    if st.session_state.query_running and st.session_state.bg_task['thread'] is not None:
-        # Check if cancellation was requested
-        if st.session_state.bg_task.get('cancelled', False):
-            # Check how long we've been waiting for cancellation
-            if 'cancel_start_time' not in st.session_state.bg_task:
-                st.session_state.bg_task['cancel_start_time'] = time.time()
-
-            cancel_elapsed = time.time() - st.session_state.bg_task['cancel_start_time']
-
-            # If thread still alive after 3 seconds, force cleanup
-            if cancel_elapsed > 3.0 and st.session_state.bg_task['thread'].is_alive():
-                st.warning(f"""
-                ⚠️ **Query Interrupted** ({cancel_elapsed:.1f}s)
-
-                The query was interrupted but DuckDB is still cleaning up. Forcing stop now.
-                """)
-                # Force cleanup
-                st.session_state.query_running = False
-                st.session_state.bg_task = {
-                    'thread': None,
-                    'status': 'idle',
-                    'results': None,
-                    'error': None,
-                    'start_time': None,
-                    'cancelled': False
-                }
-                st.rerun()
-
-            # Show cancelling message
-            st.markdown("### ⏸️ Cancelling Query...")
-            st.info(f"""
-            **Query cancellation in progress...** ({cancel_elapsed:.1f}s)
 
-            The running query has been interrupted. Waiting for cleanup...
-            """)
-
-            # Wait a bit for thread to finish cleaning up
-            time.sleep(0.3)
-            st.rerun()
+        # Run on the shared worker pool
+        st.session_state.bg_task.future = get_query_executor().submit(
+            execute_query_in_background, query_params, st.session_state.bg_task
+        )
 
-        # Check if thread is still alive
-        elif st.session_state.bg_task['thread'].is_alive():
-            # Thread still running - show live progress
-            elapsed = time.time() - st.session_state.bg_task['start_time']
-            current_status = st.session_state.bg_task['status']
-
-            # Use st.spinner for smoother updates (less jarring than status widget)
-            with st.spinner(f"🔄 Query Running... {elapsed:.0f}s elapsed"):
-                # Small sleep to show spinner
-                time.sleep(0.1)
-
-            # Show minimalist progress info
-            col_prog1, col_prog2 = st.columns([3, 1])
-            with col_prog1:
-                st.info(f"**{current_status}**")
-            with col_prog2:
-                st.metric("Elapsed", f"{elapsed:.0f}s")
-
-            # Progress bar
-            progress_value = min(elapsed / 60.0, 0.95)
-            st.progress(progress_value)
-
-            # Show query if available (collapsed by default to reduce redraw)
-            if st.session_state.bg_task.get('query'):
-                with st.expander("📋 View SQL Query"):
-                    st.code(st.session_state.bg_task['query'], language="sql")
-
-            st.caption("💡 Updates every 4 seconds • Use Cancel button in sidebar to stop")
-
-            # Poll again after 4 seconds (reduced frequency to minimize flickering)
-            time.sleep(4.0)
+        # Repeated filters are served from the results cache almost instantly;
+        # skip the progress UI and pick them up on a plain rerun instead
+        wait([st.session_state.bg_task.future], timeout=POLL_SETTINGS['quick_result_wait'])
+        if st.session_state.bg_task.future.done():
             st.rerun()
 
-        else:
-            # Thread finished - process results
-            st.session_state.query_running = False
-
-            # Check if cancelled
-            if st.session_state.bg_task.get('cancelled', False):
-                elapsed = time.time() - st.session_state.bg_task['start_time']
-                st.warning(f"⚠️ Query cancelled by user after {elapsed:.1f}s")
-                # Reset task state
-                st.session_state.bg_task = {
-                    'thread': None,
-                    'status': 'idle',
-                    'results': None,
-                    'error': None,
-                    'start_time': None,
-                    'cancelled': False
-                }
-                st.stop()
-
-            # Check for errors
-            if st.session_state.bg_task['error']:
-                # Save error info before resetting
-                elapsed = time.time() - st.session_state.bg_task['start_time']
-                error_msg = st.session_state.bg_task['error']
-
-                # Reset task state first to clear "query in progress" message
-                st.session_state.bg_task = {
-                    'thread': None,
-                    'status': 'idle',
-                    'results': None,
-                    'error': None,
-                    'start_time': None,
-                    'cancelled': False
-                }
-
-                # Handle no results specially
-                if error_msg == 'no_results':
-                    st.warning(f"""
-                    **ℹ️ No Results Found** ({elapsed:.1f}s)
-
-                    Your query didn't return any results. Try adjusting your filters:
-                    - Select a different state or expand your bounding box
-                    - Choose different categories
-                    - Increase the result limit
-                    - Check that your filters aren't too restrictive
-
-                    The query completed successfully, but no places matched your criteria.
-                    """)
-                else:
-                    # Regular error
-                    st.error(f"❌ Query failed: {error_msg}")
-
-                # Rerun to update sidebar state (instead of st.stop())
-                st.rerun()
-
-            # Success - store results
-            results = st.session_state.bg_task['results']
-            end_time = time.time()
-            execution_time = end_time - st.session_state.bg_task['start_time']
-
-            st.session_state.query_results = results
-            st.session_state.query_executed = True
-            st.session_state.execution_time = execution_time
-
-            # Show success message
-            st.success(f"✅ Query completed! Found {len(results):,} results in {execution_time:.2f}s")
+    # Progress polling reruns only the fragment, not the whole script; a query
+    # that finishes right after submit is picked up by the fragment's first poll
+    if st.session_state.query_running and st.session_state.bg_task.future is not None:
+        render_query_progress()
+        return
 
-            # Force rerun to display results
-            st.rerun()
+    # Nothing left to protect if results were cleared in the meantime
+    if st.session_state.pending_filter_change and st.session_state.query_results is None:
+        st.session_state.last_filter_type = st.session_state.pending_filter_change
+        st.session_state.pending_filter_change = None
 
     # Handle pending filter type change (confirmation dialog)
     if st.session_state.pending_filter_change:
-        st.warning(f"""
-        **⚠️ Filter Type Change Detected**
-
-        You currently have **{len(st.session_state.query_results):,} results** loaded.
-        Switching from **{st.session_state.last_filter_type}** to **{st.session_state.pending_filter_change}** will clear these results.
-        """)
-
-        col_conf1, col_conf2, col_conf3 = st.columns([1, 1, 1])
-        with col_conf1:
-            if st.button("✅ Yes, Switch Filter", type="primary", use_container_width=True):
-                # Clear results and switch filter
-                st.session_state.query_results = None
-                st.session_state.query_executed = False
-                st.session_state.last_filter_type = st.session_state.pending_filter_change
-                st.session_state.pending_filter_change = None
-                st.rerun()
-        with col_conf2:
-            if st.button("❌ Cancel", use_container_width=True):
-                # Keep current filter
-                st.session_state.pending_filter_change = None
-                st.rerun()
-
-        st.stop()  # Don't render anything else while confirmation is pending
+        confirm_filter_change_dialog(len(st.session_state.query_results))
 
     # Display results
     if st.session_state.query_executed and st.session_state.query_results is not None:
@@ -1301,21 +1773,7 @@ def main():
         if params['filter_type'] == "Map Search":
             render_map_search_interface()
         else:
-            # Welcome message
-            st.info("""
-            👈 **Get Started** - Configure your query filters in the sidebar and click **Execute Query**.
-
-            **🚀 Quick Start:**
-            1. Select a **State/Region** or switch to **Map Search**
-            2. Choose one or more **Place Categories** (e.g., hospital, restaurant)
-            3. Click **🔍 Execute Query** to fetch data from Overture Maps
-
-            **✨ Features:**
-            - 🗺️ Filter by US state or custom bounding box
-            - 📍 60+ common place categories + custom categories
-            - 📊 Interactive data table and map visualization
-            - 📥 Export to CSV, GeoJSON, KML, Parquet, or Shapefile
-            """)
+            render_welcome()
 
 
 if __name__ == "__main__":
@@ -197,6 +197,34 @@ MAX_RESULTS = {
     'shapefile': 100_000
 }
 
+# Map rendering limits
+MAP_SETTINGS = {
+    'marker_limit': 1_000,      # Individual CircleMarkers (full popups)
+    'cluster_limit': 50_000     # FastMarkerCluster (single coordinate array)
+}
+
+# Background query progress polling (seconds)
+POLL_SETTINGS = {
+    'min_interval': 0.25,
+    'max_interval': 4.0,
+    'polls_per_step': 4,        # Polls at each interval before doubling
+    'quick_result_wait': 0.15   # Seconds to wait for a cached result before polling
+}
+
+# Background query execution
+QUERY_SETTINGS = {
+    'max_workers': 4,           # Shared worker pool size
+    'max_concurrent_scans': 1,  # S3 scans running at once; others queue
+    'prewarm_on_start': True    # Load extensions and bind the view before the first query
+}
+
+# DuckDB engine settings applied when the connection is created
+DUCKDB_SETTINGS = {
+    'threads_per_core': 4,              # S3 reads block on the network, so oversubscribe cores
+    'max_threads': 64,                  # Each scan thread buffers its own Parquet reads
+    'preserve_insertion_order': False   # Lets LIMIT stop at the first rows any thread finds
+}
+
 # Default query settings
 DEFAULT_SETTINGS = {
     'state': 'TN',
@@ -1,28 +1,93 @@
 """
 DuckDB Connection Manager
-Singleton pattern for managing DuckDB connections with Overture Maps data
+One process-wide connection with Overture Maps data, shared through the
+st.cache_resource get_db_manager(); each query runs on its own cursor
 """
 
+import threading
+
 import duckdb
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import streamlit as st
-from .constants import OVERTURE_CONFIG
+from .constants import DUCKDB_SETTINGS, OVERTURE_CONFIG
+from .query_builder import places_view_name
 
 
-class DuckDBManager:
+# Low-cardinality text columns, stored as pandas categoricals
+CATEGORICAL_COLUMNS = ('category', 'state', 'city')
+
+
+def _arrow_types_mapper(arrow_type):
+    """Keep string columns Arrow-backed; numerics use regular NumPy dtypes"""
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.StringDtype("pyarrow")
+    return None
+
+
+def fetch_dataframe(result, batch_size=100_000, on_progress=None):
     """
-    Singleton pattern for managing DuckDB connections
-    Ensures single connection per Streamlit session
+    Materialize a DuckDB result as a DataFrame via Arrow
+
+    Results are streamed in record batches so progress can be reported while
+    rows arrive from S3, then converted to pandas once. Arrow conversion avoids
+    boxing every string into a Python object, which dominates fetchdf() for the
+    text-heavy places table.
+
+    Args:
+        result: DuckDB connection/relation after execute()
+        batch_size (int): Rows per streamed record batch
+        on_progress (callable, optional): Called with the running row count
+
+    Returns:
+        pandas.DataFrame: Query results
     """
+    # to_arrow_reader() replaces fetch_record_batch() in newer DuckDB releases
+    open_reader = getattr(result, 'to_arrow_reader', None) or result.fetch_record_batch
+    reader = open_reader(batch_size)
 
-    _instance = None
-    _connection = None
-    _view_created = False
-    _current_release = None
+    batches = []
+    rows_fetched = 0
+    for batch in reader:
+        batches.append(batch)
+        rows_fetched += batch.num_rows
+        if on_progress:
+            on_progress(rows_fetched)
 
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
+    table = pa.Table.from_batches(batches, schema=reader.schema)
+    del batches
+
+    # A few hundred distinct values repeat across every row; dictionary-encoded
+    # columns convert to categoricals holding each string once
+    for name in CATEGORICAL_COLUMNS:
+        index = table.schema.get_field_index(name)
+        if index != -1 and pa.types.is_string(table.schema.field(index).type):
+            table = table.set_column(index, name, pc.dictionary_encode(table.column(index)))
+
+    # split_blocks skips consolidating numeric columns into one 2D block (a
+    # full copy); self_destruct frees each Arrow column once it is converted
+    return table.to_pandas(
+        types_mapper=_arrow_types_mapper,
+        split_blocks=True,
+        self_destruct=True
+    )
+
+
+class DuckDBManager:
+    """
+    Manages a DuckDB connection with Overture Maps data
+    One instance is shared process-wide through get_db_manager()
+    """
+
+    def __init__(self):
+        self._connection = None
+        # Releases whose places view exists on the connection
+        self._view_releases = set()
+        # Background query threads may initialize concurrently; the lock makes
+        # extension loading and view creation happen once. Reentrant because
+        # create_places_view calls get_connection
+        self._init_lock = threading.RLock()
 
     def get_connection(self):
         """
@@ -30,7 +95,9 @@ class DuckDBManager:
         Reuses existing connection if available
         """
         if self._connection is None:
-            self._connection = self._initialize_connection()
+            with self._init_lock:
+                if self._connection is None:
+                    self._connection = self._initialize_connection()
         return self._connection
 
     def _initialize_connection(self):
@@ -48,17 +115,58 @@ class DuckDBManager:
             con.execute("INSTALL spatial")
             con.execute("LOAD spatial")
 
-            # Configure S3 access for Overture Maps
-            con.execute(f"SET s3_region='{OVERTURE_CONFIG['s3_region']}'")
+            # Configure S3 access for Overture Maps. GLOBAL so per-query cursors
+            # opened from this connection inherit the settings
+            con.execute(f"SET GLOBAL s3_region='{OVERTURE_CONFIG['s3_region']}'")
+
+            # Release paths are immutable, so footers and HTTP metadata read while
+            # probing and binding the view can be reused by every later query
+            con.execute("SET GLOBAL parquet_metadata_cache=true")
+            con.execute("SET GLOBAL enable_http_metadata_cache=true")
+            # Likewise, the file data itself is cached in memory; skip
+            # revalidating cached Parquet ranges against S3 on every read.
+            # Both settings are new in DuckDB 1.3; older versions run uncached
+            try:
+                con.execute("SET GLOBAL enable_external_file_cache=true")
+                con.execute("SET GLOBAL validate_external_file_cache='NO_VALIDATION'")
+            except duckdb.CatalogException:
+                pass
+
+            # Scans spend most of their time waiting on S3 range requests, so
+            # run more scan threads than cores. Start from DuckDB's default
+            # thread count, which (unlike os.cpu_count()) follows the
+            # container's cgroup CPU quota, and cap the result since each
+            # thread buffers its own Parquet reads. Results carry no ORDER BY,
+            # so rows need not come back in file order
+            cores = con.execute("SELECT current_setting('threads')").fetchone()[0]
+            threads = min(cores * DUCKDB_SETTINGS['threads_per_core'], DUCKDB_SETTINGS['max_threads'])
+            con.execute(f"SET GLOBAL threads={threads}")
+            preserve_order = str(DUCKDB_SETTINGS['preserve_insertion_order']).lower()
+            con.execute(f"SET GLOBAL preserve_insertion_order={preserve_order}")
 
             return con
         except Exception as e:
             raise ConnectionError(f"Failed to initialize DuckDB connection: {str(e)}")
 
+    def is_view_current(self, release_version=None):
+        """
+        Check whether the places view exists for the given release
+
+        Args:
+            release_version (str, optional): Overture release version. Defaults to config value.
+
+        Returns:
+            bool: True if the view is already created for this release
+        """
+        target_release = release_version or OVERTURE_CONFIG['release']
+        return target_release in self._view_releases
+
     def create_places_view(self, release_version=None):
         """
-        Create the places view from Overture Maps S3 data
-        Recreates if release version changes
+        Create the places view for a release from Overture Maps S3 data
+
+        Each release has its own view (see places_view_name), so creating one
+        never changes what queries against another release read.
 
         Args:
             release_version (str, optional): Overture release version. Defaults to config value.
@@ -66,26 +174,37 @@ class DuckDBManager:
         # Determine which release to use
         target_release = release_version or OVERTURE_CONFIG['release']
 
-        # If view exists and release hasn't changed, skip recreation
-        if self._view_created and self._current_release == target_release:
+        # Skip if this release's view already exists
+        if self.is_view_current(target_release):
             return
 
+        with self._init_lock:
+            # Another thread may have created it while this one waited
+            if not self.is_view_current(target_release):
+                self._create_places_view(target_release)
+
+    def _create_places_view(self, target_release):
+        """
+        Create the places view for a release; caller holds the init lock
+
+        Args:
+            target_release (str): Overture release version
+        """
         try:
             con = self.get_connection()
 
             # Build path for the target release
             base_path = f"s3://overturemaps-us-west-2/release/{target_release}/theme=places/type=place/*"
 
-            # Create view from Overture Maps Parquet files
+            # Create view from Overture Maps Parquet files. No filename column:
+            # nothing reads it, and queries should only project what they use
             con.execute(f"""
-                CREATE OR REPLACE VIEW places AS
+                CREATE OR REPLACE VIEW {places_view_name(target_release)} AS
                 SELECT * FROM read_parquet('{base_path}',
-                                            filename=true,
                                             hive_partitioning=1)
             """)
 
-            self._view_created = True
-            self._current_release = target_release
+            self._view_releases.add(target_release)
         except Exception as e:
             raise Exception(f"Failed to create places view: {str(e)}")
 
@@ -103,36 +222,53 @@ class DuckDBManager:
         try:
             con = self.get_connection()
 
-            # Ensure places view is created
-            if not self._view_created:
-                self.create_places_view(release_version)
+            # Ensure the release's places view is created
+            self.create_places_view(release_version)
 
-            # Execute query and return DataFrame
-            return con.execute(query).fetchdf()
+            # Each query gets its own cursor: cursors share the database, view
+            # and settings but can execute concurrently from several threads
+            cursor = con.cursor()
+            try:
+                return fetch_dataframe(cursor.execute(query))
+            finally:
+                cursor.close()
         except Exception as e:
             raise Exception(f"Query execution failed: {str(e)}")
 
-    def execute_count_query(self, query, release_version=None):
+    def execute_count_query(self, query, release_version=None, params=None, *, ceiling=None):
         """
         Execute a COUNT query for fast result preview
 
         Args:
             query (str): SQL query string
             release_version (str, optional): Overture release version
+            params (list, optional): Values bound to the query placeholders
+            ceiling (int, optional): Stop counting past this many rows; the
+                scan ends early and the result is at most ceiling + 1
 
         Returns:
-            int: Count of results
+            int: Count of results (ceiling + 1 means "more than ceiling")
         """
         try:
             con = self.get_connection()
 
-            # Ensure places view is created
-            if not self._view_created:
-                self.create_places_view(release_version)
+            # Ensure the release's places view is created
+            self.create_places_view(release_version)
 
-            # Wrap query in COUNT
-            count_query = f"SELECT COUNT(*) as count FROM ({query}) AS subquery"
-            result = con.execute(count_query).fetchone()
+            # Wrap query in COUNT; with a ceiling the LIMIT lets DuckDB stop
+            # scanning once one row past it has been found
+            if ceiling is None:
+                count_query = f"SELECT COUNT(*) as count FROM ({query}) AS subquery"
+            else:
+                count_query = (
+                    f"SELECT COUNT(*) as count FROM "
+                    f"(SELECT 1 FROM ({query}) AS subquery LIMIT {int(ceiling) + 1}) AS bounded"
+                )
+            cursor = con.cursor()
+            try:
+                result = cursor.execute(count_query, params or []).fetchone()
+            finally:
+                cursor.close()
             return result[0] if result else 0
         except Exception as e:
             raise Exception(f"Count query failed: {str(e)}")
@@ -142,15 +278,19 @@ class DuckDBManager:
         if self._connection:
             self._connection.close()
             self._connection = None
-            self._view_created = False
+            self._view_releases.clear()
 
 
-# Helper function for Streamlit session state
+@st.cache_resource(show_spinner=False)
 def get_db_manager():
     """
-    Get DuckDB manager from Streamlit session state
-    Creates one if it doesn't exist
+    Process-wide DuckDB manager
+
+    Cached as a resource so the connection, loaded extensions and places view
+    persist across reruns and sessions instead of being rebuilt per query.
+    Queries run on their own cursors of the shared connection.
+
+    Returns:
+        DuckDBManager: Shared manager instance
     """
-    if 'db_manager' not in st.session_state:
-        st.session_state.db_manager = DuckDBManager()
-    return st.session_state.db_manager
+    return DuckDBManager()
@@ -1,16 +1,66 @@
 """
 Data Export Handlers for Multiple Formats
-Supports CSV, GeoJSON, KML, Parquet, and Shapefile exports
+Supports CSV, GeoJSON, GeoJSON text sequence, KML, Parquet, and Shapefile exports
 """
 
-import json
-import io
+import os
+import tempfile
 import zipfile
 from abc import ABC, abstractmethod
-from typing import BinaryIO
+from typing import BinaryIO, Tuple
+from xml.sax.saxutils import escape
+import numpy as np
+import orjson
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 import geopandas as gpd
-from shapely.geometry import Point
+
+# Exports larger than this spill from memory to a temporary file
+SPOOL_MAX_SIZE = 64 * 1024 * 1024
+
+# Rows encoded per write by the streaming (CSV, GeoJSON) exporters
+EXPORT_CHUNK_ROWS = 50_000
+
+
+def _located_rows(df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """
+    Rows with both coordinates present, plus their coordinates as float arrays
+
+    Args:
+        df (pd.DataFrame): Data to export
+
+    Returns:
+        Tuple[pd.DataFrame, np.ndarray, np.ndarray]: (rows, longitudes,
+        latitudes); empty if either coordinate column is absent
+    """
+    if 'longitude' not in df.columns or 'latitude' not in df.columns:
+        return df.iloc[0:0], np.empty(0), np.empty(0)
+    located = df[df['longitude'].notna() & df['latitude'].notna()]
+    return (
+        located,
+        located['longitude'].to_numpy(dtype=float),
+        located['latitude'].to_numpy(dtype=float)
+    )
+
+
+def _column_text(df: pd.DataFrame, column: str, missing) -> list:
+    """
+    Column values as strings, converted once per column
+
+    Args:
+        df (pd.DataFrame): Rows to read
+        column (str): Column name
+        missing: Value used for nulls, or for every row if the column is absent
+
+    Returns:
+        list: One entry per row
+    """
+    if column not in df.columns:
+        return [missing] * len(df)
+    values = df[column]
+    return values.astype(str).astype(object).where(values.notna(), missing).tolist()
 
 
 class BaseExporter(ABC):
@@ -53,10 +103,15 @@ class CSVExporter(BaseExporter):
 
     def export(self, df: pd.DataFrame, buffer: BinaryIO) -> None:
         """Export to CSV format"""
-        # Convert buffer to text mode for pandas
-        text_buffer = io.TextIOWrapper(buffer, encoding='utf-8', newline='', write_through=True)
-        df.to_csv(text_buffer, index=False)
-        text_buffer.detach()  # Detach to prevent closing the underlying buffer
+        # Arrow's C++ writer formats values natively and writes bytes
+        # straight to the binary buffer; text fields are always quoted.
+        # Rows are converted a chunk at a time so only one chunk's Arrow
+        # copy is alive at once
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+        with pacsv.CSVWriter(buffer, schema, write_options=pacsv.WriteOptions(include_header=True)) as writer:
+            for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+                chunk = df.iloc[start:start + EXPORT_CHUNK_ROWS]
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
         buffer.seek(0)
 
     def get_mime_type(self) -> str:
@@ -69,50 +124,60 @@ class CSVExporter(BaseExporter):
 class GeoJSONExporter(BaseExporter):
     """GeoJSON FeatureCollection with proper geometry"""
 
+    PROPERTY_COLUMNS = ('id', 'name', 'category', 'state', 'city')
+
     def export(self, df: pd.DataFrame, buffer: BinaryIO) -> None:
         """Export to GeoJSON format"""
-        if df.empty:
-            # Empty FeatureCollection
-            geojson = {
-                "type": "FeatureCollection",
-                "features": []
-            }
-        else:
-            # Create features list
-            features = []
-
-            for _, row in df.iterrows():
-                # Skip rows without coordinates
-                if pd.isna(row.get('longitude')) or pd.isna(row.get('latitude')):
-                    continue
-
-                feature = {
-                    "type": "Feature",
-                    "geometry": {
-                        "type": "Point",
-                        "coordinates": [float(row['longitude']), float(row['latitude'])]
-                    },
-                    "properties": {
-                        "id": str(row.get('id', '')),
-                        "name": str(row.get('name', '')),
-                        "category": str(row.get('category', '')),
-                        "state": str(row.get('state', '')),
-                        "city": str(row.get('city', ''))
-                    }
-                }
-                features.append(feature)
-
-            geojson = {
-                "type": "FeatureCollection",
-                "features": features
-            }
-
-        # Write to buffer
-        text_buffer = io.TextIOWrapper(buffer, encoding='utf-8', write_through=True)
-        json.dump(geojson, text_buffer, indent=2)
-        text_buffer.detach()  # Detach to prevent closing the underlying buffer
+        # The FeatureCollection is written a chunk of features at a time, so
+        # peak memory is one chunk's dicts and bytes rather than the whole
+        # document. Output matches orjson's OPT_INDENT_2 layout
+        buffer.write(b'{\n  "type": "FeatureCollection",\n  "features": [')
+        wrote_features = False
+        for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+            features = self._features(df.iloc[start:start + EXPORT_CHUNK_ROWS])
+            if not features:
+                continue
+            # Strip the list's own brackets and nest its lines one level deeper;
+            # JSON strings never contain a raw newline
+            body = orjson.dumps(features, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)[2:-2]
+            buffer.write(b',\n  ' if wrote_features else b'\n  ')
+            buffer.write(body.replace(b'\n', b'\n  '))
+            wrote_features = True
+        buffer.write(b'\n  ]\n}' if wrote_features else b']\n}')
         buffer.seek(0)
 
+    def _features(self, df: pd.DataFrame) -> list:
+        """
+        GeoJSON Point features for rows that have coordinates
+
+        Args:
+            df (pd.DataFrame): Rows to convert
+
+        Returns:
+            list: Feature dicts
+        """
+        located, lons, lats = _located_rows(df)
+
+        # Columns are pulled out once and zipped, instead of boxing every row
+        # into a Series; missing values become null properties
+        properties = [_column_text(located, column, None) for column in self.PROPERTY_COLUMNS]
+
+        # Each coordinate pair is a row view of one (N, 2) array, which orjson
+        # serializes directly (OPT_SERIALIZE_NUMPY) without boxing Python floats
+        coordinates = np.column_stack([lons, lats])
+
+        return [
+            {
+                "type": "Feature",
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": point
+                },
+                "properties": dict(zip(self.PROPERTY_COLUMNS, values))
+            }
+            for point, *values in zip(coordinates, *properties)
+        ]
+
     def get_mime_type(self) -> str:
         return 'application/geo+json'
 
@@ -120,12 +185,58 @@ class GeoJSONExporter(BaseExporter):
         return 'geojson'
 
 
+class GeoJSONSeqExporter(GeoJSONExporter):
+    """
+    GeoJSON text sequence (RFC 8142): one Feature per record
+
+    Each feature is written as soon as its chunk is encoded; there is no
+    enclosing FeatureCollection, so readers can stream it too.
+    """
+
+    def export(self, df: pd.DataFrame, buffer: BinaryIO) -> None:
+        """Export to GeoJSON text sequence format"""
+        dumps = orjson.dumps
+        option = orjson.OPT_SERIALIZE_NUMPY
+        for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+            features = self._features(df.iloc[start:start + EXPORT_CHUNK_ROWS])
+            # Records are an ASCII record separator, the feature and a newline
+            buffer.write(b''.join(b'\x1e' + dumps(feature, option=option) + b'\n' for feature in features))
+        buffer.seek(0)
+
+    def get_mime_type(self) -> str:
+        return 'application/geo+json-seq'
+
+    def get_file_extension(self) -> str:
+        return 'geojsons'
+
+
 class ParquetExporter(BaseExporter):
     """Efficient Parquet format for large datasets"""
 
+    def __init__(self, compression: str = 'zstd', compression_level: int = 3,
+                 row_group_size: int = 65536):
+        """
+        Args:
+            compression (str): Parquet codec
+            compression_level (int): Codec level; zstd 3 is smaller than snappy at similar speed
+            row_group_size (int): Maximum rows per row group
+        """
+        self.compression = compression
+        self.compression_level = compression_level
+        self.row_group_size = row_group_size
+
     def export(self, df: pd.DataFrame, buffer: BinaryIO) -> None:
         """Export to Parquet format"""
-        df.to_parquet(buffer, compression='snappy', index=False)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_table(
+            table,
+            buffer,
+            compression=self.compression,
+            compression_level=self.compression_level,
+            row_group_size=self.row_group_size,
+            use_dictionary=True,
+            data_page_size=1 << 20
+        )
         buffer.seek(0)
 
     def get_mime_type(self) -> str:
@@ -138,39 +249,7 @@ class ParquetExporter(BaseExporter):
 class KMLExporter(BaseExporter):
     """KML format for Google Earth and mapping applications"""
 
-    def export(self, df: pd.DataFrame, buffer: BinaryIO) -> None:
-        """Export to KML format"""
-        # Build KML XML structure
-        kml_parts = [
-            '<?xml version="1.0" encoding="UTF-8"?>',
-            '<kml xmlns="http://www.opengis.net/kml/2.2">',
-            '<Document>',
-            '<name>Overture Maps Places Export</name>',
-            '<description>Exported places data from Overture Maps</description>'
-        ]
-
-        # Add styles for different categories
-        kml_parts.extend([
-            '<Style id="defaultStyle">',
-            '<IconStyle>',
-            '<Icon><href>http://maps.google.com/mapfiles/kml/pushpin/ylw-pushpin.png</href></Icon>',
-            '</IconStyle>',
-            '</Style>'
-        ])
-
-        # Add placemarks for each location
-        if not df.empty:
-            for _, row in df.iterrows():
-                # Skip rows without coordinates
-                if pd.isna(row.get('longitude')) or pd.isna(row.get('latitude')):
-                    continue
-
-                name = str(row.get('name', 'Unknown')).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                category = str(row.get('category', 'N/A')).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                city = str(row.get('city', 'N/A')).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                state = str(row.get('state', 'N/A')).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-
-                placemark = f'''
+    PLACEMARK_TEMPLATE = '''
 <Placemark>
     <name>{name}</name>
     <description>
@@ -182,21 +261,79 @@ class KMLExporter(BaseExporter):
     </description>
     <styleUrl>#defaultStyle</styleUrl>
     <Point>
-        <coordinates>{row['longitude']},{row['latitude']},0</coordinates>
+        <coordinates>{lon},{lat},0</coordinates>
     </Point>
 </Placemark>'''
-                kml_parts.append(placemark)
 
-        # Close document
-        kml_parts.extend(['</Document>', '</kml>'])
+    # Document header (with the default style) and footer, encoded once
+    DOCUMENT_START = '\n'.join([
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<kml xmlns="http://www.opengis.net/kml/2.2">',
+        '<Document>',
+        '<name>Overture Maps Places Export</name>',
+        '<description>Exported places data from Overture Maps</description>',
+        '<Style id="defaultStyle">',
+        '<IconStyle>',
+        '<Icon><href>http://maps.google.com/mapfiles/kml/pushpin/ylw-pushpin.png</href></Icon>',
+        '</IconStyle>',
+        '</Style>'
+    ]).encode('utf-8')
+    DOCUMENT_END = b'\n</Document>\n</kml>'
+
+    @staticmethod
+    def _escaped_column(df: pd.DataFrame, column: str, missing: str) -> list:
+        """
+        Column text with XML special characters escaped
 
-        # Write to buffer
-        kml_content = '\n'.join(kml_parts)
-        text_buffer = io.TextIOWrapper(buffer, encoding='utf-8', write_through=True)
-        text_buffer.write(kml_content)
-        text_buffer.detach()
+        Each distinct value is escaped once and gathered back per row, so
+        repetitive columns (category, city, state) cost one escape per value.
+        """
+        if column not in df.columns:
+            return [missing] * len(df)
+        # Nulls get code -1, which picks the trailing default
+        codes, uniques = pd.factorize(df[column])
+        labels = np.array([escape(str(value)) for value in uniques] + [missing], dtype=object)
+        return labels[codes].tolist()
+
+    def export(self, df: pd.DataFrame, buffer: BinaryIO) -> None:
+        """Export to KML format"""
+        buffer.write(self.DOCUMENT_START)
+
+        # Placemarks are encoded and written a chunk at a time instead of
+        # joining the whole document into one string first
+        for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+            placemarks = self._placemarks(df.iloc[start:start + EXPORT_CHUNK_ROWS])
+            if placemarks:
+                buffer.write(('\n' + '\n'.join(placemarks)).encode('utf-8'))
+
+        buffer.write(self.DOCUMENT_END)
         buffer.seek(0)
 
+    def _placemarks(self, df: pd.DataFrame) -> list:
+        """
+        Placemark elements for rows that have coordinates
+
+        Args:
+            df (pd.DataFrame): Rows to convert
+
+        Returns:
+            list: Placemark XML strings
+        """
+        # Columns are converted and escaped once each, then the template is
+        # filled per row
+        located, lons, lats = _located_rows(df)
+        lons, lats = lons.tolist(), lats.tolist()
+        names = self._escaped_column(located, 'name', 'Unknown')
+        categories = self._escaped_column(located, 'category', 'N/A')
+        cities = self._escaped_column(located, 'city', 'N/A')
+        states = self._escaped_column(located, 'state', 'N/A')
+
+        format_placemark = self.PLACEMARK_TEMPLATE.format
+        return [
+            format_placemark(name=name, category=category, city=city, state=state, lon=lon, lat=lat)
+            for name, category, city, state, lon, lat in zip(names, categories, cities, states, lons, lats)
+        ]
+
     def get_mime_type(self) -> str:
         return 'application/vnd.google-earth.kml+xml'
 
@@ -218,9 +355,14 @@ class ShapefileExporter(BaseExporter):
         if df_clean.empty:
             raise ValueError("No valid coordinates found in dataset")
 
-        # Create GeoDataFrame with Point geometries
-        geometry = [Point(xy) for xy in zip(df_clean['longitude'], df_clean['latitude'])]
-        gdf = gpd.GeoDataFrame(df_clean, geometry=geometry, crs='EPSG:4326')
+        # Build all Point geometries in one vectorized call; the CRS travels
+        # with the geometry array
+        geometry = gpd.points_from_xy(
+            df_clean['longitude'].to_numpy(),
+            df_clean['latitude'].to_numpy(),
+            crs='EPSG:4326'
+        )
+        gdf = gpd.GeoDataFrame(df_clean, geometry=geometry)
 
         # Shapefiles have field name limitations (10 chars)
         # Rename columns to fit
@@ -234,23 +376,17 @@ class ShapefileExporter(BaseExporter):
         if 'lon' in gdf.columns:
             gdf = gdf.drop(columns=['lon', 'lat'])
 
-        # Create temporary directory for shapefile components
-        with io.BytesIO() as temp_buffer:
-            # Save to temporary shapefile
-            temp_shp_path = '/tmp/export_temp.shp'
+        # Shapefiles are several sidecar files, which GDAL cannot write to a
+        # Python buffer. Each export gets its own directory so concurrent
+        # sessions never overwrite each other's components
+        with tempfile.TemporaryDirectory(prefix='shapefile_export_') as temp_dir:
+            temp_shp_path = os.path.join(temp_dir, 'export.shp')
             gdf.to_file(temp_shp_path, driver='ESRI Shapefile')
 
             # Create zip file with all shapefile components
             with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                # Add all shapefile components
-                extensions = ['.shp', '.shx', '.dbf', '.prj', '.cpg']
-                for ext in extensions:
-                    file_path = temp_shp_path.replace('.shp', ext)
-                    try:
-                        zipf.write(file_path, f'export{ext}')
-                    except FileNotFoundError:
-                        # Some extensions might not exist
-                        pass
+                for file_name in sorted(os.listdir(temp_dir)):
+                    zipf.write(os.path.join(temp_dir, file_name), file_name)
 
             buffer.seek(0)
 
@@ -267,15 +403,19 @@ class ExporterFactory:
     _exporters = {
         'csv': CSVExporter,
         'geojson': GeoJSONExporter,
+        'geojsonseq': GeoJSONSeqExporter,
         'kml': KMLExporter,
         'parquet': ParquetExporter,
         'shapefile': ShapefileExporter
     }
 
+    # Exporters hold no per-export state, so one instance per format is reused
+    _instances = {}
+
     @classmethod
     def get_exporter(cls, format_name: str) -> BaseExporter:
         """
-        Get exporter instance for format
+        Get the shared exporter instance for format
 
         Args:
             format_name (str): Format name (csv, geojson, parquet, shapefile)
@@ -291,7 +431,10 @@ class ExporterFactory:
         if format_lower not in cls._exporters:
             raise ValueError(f"Unsupported export format: {format_name}")
 
-        return cls._exporters[format_lower]()
+        exporter = cls._instances.get(format_lower)
+        if exporter is None:
+            exporter = cls._instances.setdefault(format_lower, cls._exporters[format_lower]())
+        return exporter
 
     @classmethod
     def get_supported_formats(cls) -> list:
@@ -317,8 +460,9 @@ def export_dataframe(df: pd.DataFrame, format_name: str) -> tuple:
     """
     exporter = ExporterFactory.get_exporter(format_name)
 
-    # Create buffer
-    buffer = io.BytesIO()
+    # Small exports stay in memory; large ones roll over to disk instead of
+    # holding another full copy of the results in RAM
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
 
     # Export to buffer
     exporter.export(df, buffer)
@@ -3,7 +3,26 @@ SQL Query Builder for Overture Maps
 Constructs parameterized DuckDB SQL queries with validation
 """
 
-from typing import List, Optional, Dict
+from dataclasses import dataclass
+from typing import List, Optional, Dict, Tuple
+
+from .constants import OVERTURE_CONFIG, STATE_BBOXES
+
+
+def places_view_name(release_version: str) -> str:
+    """
+    Name of the places view for an Overture release
+
+    Every release gets its own view, so sessions on different releases can
+    share one connection without replacing the view under each other.
+
+    Args:
+        release_version (str): Overture release version
+
+    Returns:
+        str: Quoted view identifier, e.g. "places_2026-01-21.0"
+    """
+    return '"places_' + release_version.replace('"', '""') + '"'
 
 
 class OvertureQueryBuilder:
@@ -12,12 +31,29 @@ class OvertureQueryBuilder:
     Supports multiple filter types with validation
     """
 
+    __slots__ = (
+        'filters', 'categories', 'limit', 'state_filter', 'bbox_filter',
+        'coordinates_required', 'view'
+    )
+
     def __init__(self):
         self.filters = []
         self.categories = []
         self.limit = None
         self.state_filter = None
         self.bbox_filter = None
+        self.coordinates_required = False
+        self.view = places_view_name(OVERTURE_CONFIG['release'])
+
+    def set_release(self, release_version: str):
+        """
+        Query the places view of a specific release instead of the default
+
+        Args:
+            release_version (str): Overture release version
+        """
+        self.view = places_view_name(release_version)
+        return self
 
     def add_state_filter(self, state_code: str):
         """
@@ -51,10 +87,22 @@ class OvertureQueryBuilder:
         """
         Add category.primary filters
 
+        Duplicates are dropped, keeping the first occurrence's position.
+
         Args:
             category_list (List[str]): List of category names
         """
-        self.categories = category_list
+        self.categories = list(dict.fromkeys(category_list))
+        return self
+
+    def require_coordinates(self):
+        """
+        Only return places that have a point geometry
+
+        Lets DuckDB drop rows without coordinates during the scan instead of
+        fetching them and discarding them in pandas.
+        """
+        self.coordinates_required = True
         return self
 
     def set_limit(self, max_results: int):
@@ -67,15 +115,18 @@ class OvertureQueryBuilder:
         self.limit = max_results
         return self
 
-    def build(self) -> str:
-        """
-        Construct final SQL query with all filters
+    # Degrees added around a state's extent when it is used as a pruning hint,
+    # so places near an approximate state border are never excluded
+    STATE_HINT_PADDING = 0.5
 
-        Returns:
-            str: Complete SQL query string
-        """
-        # Base SELECT statement with coordinates
-        query = """
+    # STATE_BBOXES entries that don't cover the whole state: TN is the
+    # Nashville preset, Alaska's Aleutians cross the antimeridian, and HI's
+    # entry covers only the main islands, not the Northwestern Hawaiian
+    # Islands out to Kure Atoll (about -178.3)
+    STATE_HINT_EXCLUDED = frozenset({'TN', 'AK', 'HI'})
+
+    # Base SELECT statement with coordinates; {view} is the places view
+    SELECT_CLAUSE = """
         SELECT
             id,
             names.primary as name,
@@ -84,33 +135,114 @@ class OvertureQueryBuilder:
             addresses[1].locality as city,
             ST_X(geometry) as longitude,
             ST_Y(geometry) as latitude
-        FROM places
+        FROM {view}
+        """
+
+    # Prefix shared by the count queries
+    COUNT_CLAUSE = "SELECT COUNT(*) as count FROM {view}"
+
+    @staticmethod
+    def _bounds_condition(bounds: Dict, parameterized: bool) -> Tuple[str, List]:
+        """
+        Plain comparisons on the bbox struct, which Parquet min/max stats can prune
+
+        Args:
+            bounds (Dict): xmin, xmax, ymin, ymax
+            parameterized (bool): Use ? placeholders instead of inline literals
+
+        Returns:
+            Tuple[str, List]: Condition and bound values
         """
+        if parameterized:
+            return (
+                "bbox.xmin >= ? AND bbox.xmax <= ? AND bbox.ymin >= ? AND bbox.ymax <= ?",
+                [bounds['xmin'], bounds['xmax'], bounds['ymin'], bounds['ymax']]
+            )
+        return (
+            f"bbox.xmin >= {bounds['xmin']} AND bbox.xmax <= {bounds['xmax']} "
+            f"AND bbox.ymin >= {bounds['ymin']} AND bbox.ymax <= {bounds['ymax']}",
+            []
+        )
 
-        # Build WHERE clause
+    def _where_clause(self, parameterized: bool = False) -> Tuple[str, List]:
+        """
+        Build the WHERE clause shared by the data and count queries
+
+        Args:
+            parameterized (bool): Use ? placeholders instead of inline literals
+
+        Returns:
+            Tuple[str, List]: WHERE clause (empty if no filters) and bound values
+        """
         where_conditions = []
+        params = []
 
         # Add category filter
         if self.categories:
-            # Escape and format category names
-            formatted_categories = [f"'{cat}'" for cat in self.categories]
-            categories_str = ', '.join(formatted_categories)
-            where_conditions.append(f"categories.primary IN ({categories_str})")
+            if parameterized:
+                placeholders = ', '.join('?' for _ in self.categories)
+                where_conditions.append(f"categories.primary IN ({placeholders})")
+                params.extend(self.categories)
+            else:
+                # Quote category names in a single join
+                categories_str = "'" + "', '".join(self.categories) + "'"
+                where_conditions.append(f"categories.primary IN ({categories_str})")
 
         # Add spatial filter (prefer bbox over state for performance)
         if self.bbox_filter:
             bbox = self.bbox_filter
-            # Use spatial predicate for efficient filtering
+            # Plain comparisons on the bbox struct let the Parquet reader skip
+            # files and row groups by their min/max statistics
+            condition, values = self._bounds_condition(bbox, parameterized)
+            where_conditions.append(condition)
+            params.extend(values)
+
             # Filter on actual point location, not bbox metadata
-            where_conditions.append(
-                f"ST_Within(geometry, ST_MakeEnvelope({bbox['xmin']}, {bbox['ymin']}, {bbox['xmax']}, {bbox['ymax']}))"
-            )
+            if parameterized:
+                where_conditions.append("ST_Within(geometry, ST_MakeEnvelope(?, ?, ?, ?))")
+                params.extend([bbox['xmin'], bbox['ymin'], bbox['xmax'], bbox['ymax']])
+            else:
+                where_conditions.append(
+                    f"ST_Within(geometry, ST_MakeEnvelope({bbox['xmin']}, {bbox['ymin']}, {bbox['xmax']}, {bbox['ymax']}))"
+                )
         elif self.state_filter:
-            where_conditions.append(f"addresses[1].region = '{self.state_filter}'")
+            if parameterized:
+                where_conditions.append("addresses[1].region = ?")
+                params.append(self.state_filter)
+            else:
+                where_conditions.append(f"addresses[1].region = '{self.state_filter}'")
+
+            # The region column has no useful file statistics; a padded state
+            # extent gives the scan the same bbox pruning as map searches
+            state_bbox = STATE_BBOXES.get(self.state_filter)
+            if state_bbox and self.state_filter not in self.STATE_HINT_EXCLUDED:
+                pad = self.STATE_HINT_PADDING
+                hint = {
+                    'xmin': state_bbox['xmin'] - pad, 'xmax': state_bbox['xmax'] + pad,
+                    'ymin': state_bbox['ymin'] - pad, 'ymax': state_bbox['ymax'] + pad
+                }
+                condition, values = self._bounds_condition(hint, parameterized)
+                where_conditions.append(condition)
+                params.extend(values)
+
+        # Skip rows that can't be mapped
+        if self.coordinates_required:
+            where_conditions.append("geometry IS NOT NULL")
 
         # Combine WHERE conditions
-        if where_conditions:
-            query += "\nWHERE " + "\nAND ".join(where_conditions)
+        if not where_conditions:
+            return "", params
+        return "\nWHERE " + "\nAND ".join(where_conditions), params
+
+    def build(self) -> str:
+        """
+        Construct final SQL query with all filters
+
+        Returns:
+            str: Complete SQL query string
+        """
+        where_clause, _ = self._where_clause()
+        query = self.SELECT_CLAUSE.format(view=self.view) + where_clause
 
         # Add LIMIT
         if self.limit:
@@ -118,40 +250,46 @@ class OvertureQueryBuilder:
 
         return query
 
-    def build_count_query(self) -> str:
+    def build_parameterized(self) -> Tuple[str, List]:
         """
-        Fast count query for result preview
+        Construct the SQL query with ? placeholders and bound values
+
+        Filter values travel as parameters instead of being spliced into the
+        SQL text, so nothing needs escaping.
 
         Returns:
-            str: COUNT query string
+            Tuple[str, List]: SQL query string and its parameter values
         """
-        # Build a query similar to build() but only selecting COUNT
-        query = "SELECT COUNT(*) as count FROM places"
+        where_clause, params = self._where_clause(parameterized=True)
+        query = self.SELECT_CLAUSE.format(view=self.view) + where_clause
 
-        # Build WHERE clause
-        where_conditions = []
+        # Add LIMIT
+        if self.limit:
+            query += "\nLIMIT ?"
+            params.append(int(self.limit))
 
-        # Add category filter
-        if self.categories:
-            formatted_categories = [f"'{cat}'" for cat in self.categories]
-            categories_str = ', '.join(formatted_categories)
-            where_conditions.append(f"categories.primary IN ({categories_str})")
+        return query, params
 
-        # Add spatial filter
-        if self.bbox_filter:
-            bbox = self.bbox_filter
-            # Use spatial predicate for efficient filtering
-            where_conditions.append(
-                f"ST_Within(geometry, ST_MakeEnvelope({bbox['xmin']}, {bbox['ymin']}, {bbox['xmax']}, {bbox['ymax']}))"
-            )
-        elif self.state_filter:
-            where_conditions.append(f"addresses[1].region = '{self.state_filter}'")
+    def build_count_query(self) -> str:
+        """
+        Fast count query for result preview
 
-        # Combine WHERE conditions
-        if where_conditions:
-            query += "\nWHERE " + "\nAND ".join(where_conditions)
+        Returns:
+            str: COUNT query string
+        """
+        # Same WHERE clause as build() but only selecting COUNT
+        where_clause, _ = self._where_clause()
+        return self.COUNT_CLAUSE.format(view=self.view) + where_clause
 
-        return query
+    def build_count_query_parameterized(self) -> Tuple[str, List]:
+        """
+        Count query with ? placeholders and bound values
+
+        Returns:
+            Tuple[str, List]: COUNT query string and its parameter values
+        """
+        where_clause, params = self._where_clause(parameterized=True)
+        return self.COUNT_CLAUSE.format(view=self.view) + where_clause, params
 
     def reset(self):
         """Reset all filters and settings"""
@@ -160,9 +298,84 @@ class OvertureQueryBuilder:
         self.limit = None
         self.state_filter = None
         self.bbox_filter = None
+        self.coordinates_required = False
+        self.view = places_view_name(OVERTURE_CONFIG['release'])
         return self
 
 
+@dataclass(frozen=True)
+class QueryParams:
+    """
+    Immutable snapshot of the filters for one query run
+    Hashable, so it can be handed to a worker thread or used as a cache key
+    """
+
+    categories: Tuple[str, ...] = ()
+    state: Optional[str] = None
+    bbox: Optional[Tuple[float, float, float, float]] = None  # (xmin, xmax, ymin, ymax)
+    limit: Optional[int] = None
+    release: Optional[str] = None
+
+    @classmethod
+    def from_filters(cls, params: Dict, release: Optional[str] = None) -> "QueryParams":
+        """
+        Snapshot the sidebar filter dict
+
+        Only the filter matching filter_type is kept, and categories are sorted
+        so the same selection always produces the same SQL.
+
+        Args:
+            params (Dict): Sidebar filters (filter_type, state, bbox, categories, limit)
+            release (str, optional): Overture release version
+
+        Returns:
+            QueryParams: Frozen query parameters
+        """
+        state = None
+        bbox = None
+        if params.get('filter_type') == "Map Search":
+            if params.get('bbox'):
+                b = params['bbox']
+                bbox = (b['xmin'], b['xmax'], b['ymin'], b['ymax'])
+        else:
+            state = params.get('state')
+
+        return cls(
+            categories=tuple(sorted(params.get('categories') or [])),
+            state=state,
+            bbox=bbox,
+            limit=params.get('limit') or None,
+            release=release
+        )
+
+    def to_builder(self) -> OvertureQueryBuilder:
+        """
+        Create a query builder configured with these filters
+
+        Returns:
+            OvertureQueryBuilder: Builder ready for further options or build()
+        """
+        builder = OvertureQueryBuilder()
+
+        # Name the release's own view, so the SQL reads that release even
+        # while other sessions query another one
+        if self.release:
+            builder.set_release(self.release)
+
+        if self.categories:
+            builder.add_categories(list(self.categories))
+
+        if self.bbox:
+            builder.add_bbox_filter(*self.bbox)
+        elif self.state:
+            builder.add_state_filter(self.state)
+
+        if self.limit:
+            builder.set_limit(self.limit)
+
+        return builder
+
+
 def build_query_from_params(
     state: Optional[str] = None,
     bbox: Optional[Dict[str, float]] = None,
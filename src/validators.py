@@ -4,10 +4,20 @@ Validates user inputs for safety and correctness
 """
 
 import re
+import string
 from typing import List, Tuple
+
+import numpy as np
 from .constants import US_STATES, MAX_RESULTS
 
 
+# Characters allowed in category names. Quotes, semicolons and comment
+# markers are all outside this set
+_CATEGORY_CHARS = frozenset(string.ascii_letters + string.digits + '_- ')
+# SQL statements spelled with allowed characters only
+_SQL_KEYWORDS_RE = re.compile(r"DROP\s+TABLE|DELETE\s+FROM|INSERT\s+INTO|UPDATE\s+", re.IGNORECASE)
+
+
 class ValidationError(Exception):
     """Custom exception for validation failures"""
     pass
@@ -51,6 +61,12 @@ class InputValidator:
         Returns:
             Tuple[bool, str]: (is_valid, error_message)
         """
+        # Most boxes are valid: accept them with one chained test and only
+        # work out which rule failed otherwise (NaN fails the chain too)
+        if (-180 <= xmin < xmax <= 180 and -90 <= ymin < ymax <= 90
+                and xmax - xmin <= 50 and ymax - ymin <= 50):
+            return True, ""
+
         # Check longitude range: -180 to 180
         if not (-180 <= xmin <= 180):
             return False, f"Minimum longitude must be between -180 and 180. Got: {xmin}"
@@ -81,6 +97,29 @@ class InputValidator:
 
         return True, ""
 
+    @staticmethod
+    def validate_bboxes(bboxes: np.ndarray) -> np.ndarray:
+        """
+        Validate many bounding boxes at once
+
+        Applies the same rules as validate_bbox as array comparisons, without
+        building an error message per box.
+
+        Args:
+            bboxes (np.ndarray): Shape (N, 4) rows of (xmin, xmax, ymin, ymax)
+
+        Returns:
+            np.ndarray: Boolean mask, True where the bbox is valid
+        """
+        bboxes = np.asarray(bboxes, dtype=float).reshape(-1, 4)
+        xmin, xmax, ymin, ymax = bboxes.T
+
+        lon_ok = (xmin >= -180) & (xmax <= 180) & (xmin < xmax)
+        lat_ok = (ymin >= -90) & (ymax <= 90) & (ymin < ymax)
+        size_ok = ((xmax - xmin) <= 50) & ((ymax - ymin) <= 50)
+
+        return lon_ok & lat_ok & size_ok
+
     @staticmethod
     def validate_category(category_name: str) -> Tuple[bool, str]:
         """
@@ -95,27 +134,19 @@ class InputValidator:
         if not category_name:
             return False, "Category name cannot be empty"
 
-        # Check for SQL injection patterns
-        dangerous_patterns = [
-            r"'.*--",  # SQL comment
-            r";.*",    # Multiple statements
-            r"DROP\s+TABLE",  # DROP TABLE
-            r"DELETE\s+FROM",  # DELETE
-            r"INSERT\s+INTO",  # INSERT
-            r"UPDATE\s+",      # UPDATE
-        ]
-
-        for pattern in dangerous_patterns:
-            if re.search(pattern, category_name, re.IGNORECASE):
-                return False, "Category name contains invalid characters"
-
         # Check reasonable length
         if len(category_name) > 100:
             return False, "Category name is too long (max 100 characters)"
 
         # Check for valid characters (letters, numbers, underscores, hyphens)
-        if not re.match(r'^[a-zA-Z0-9_\- ]+$', category_name):
-            return False, "Category name can only contain letters, numbers, spaces, underscores, and hyphens"
+        if not _CATEGORY_CHARS.issuperset(category_name):
+            return False, (
+                "Category name contains invalid characters: it can only contain "
+                "letters, numbers, spaces, underscores, and hyphens"
+            )
+
+        if _SQL_KEYWORDS_RE.search(category_name):
+            return False, "Category name contains invalid characters"
 
         return True, ""
 
@@ -181,16 +212,6 @@ class InputValidator:
         Returns:
             str: Sanitized category name
         """
-        # Remove leading/trailing whitespace
-        sanitized = category_name.strip()
-
-        # Replace multiple spaces with single space
-        sanitized = re.sub(r'\s+', ' ', sanitized)
-
-        # Convert to lowercase for consistency
-        sanitized = sanitized.lower()
-
-        # Replace spaces with underscores
-        sanitized = sanitized.replace(' ', '_')
-
-        return sanitized
+        # Lowercase, then split on runs of whitespace (which also drops
+        # leading/trailing whitespace) and join the words with underscores
+        return '_'.join(category_name.lower().split())
@@ -23,10 +23,12 @@ if "ST_Within" in query:
 else:
     print("✗ NOT using ST_Within - using slow metadata filtering!")
 
-if "bbox.xmin" in query:
-    print("✗ Still using old bbox metadata filtering!")
+# Plain bbox comparisons let Parquet min/max stats skip row groups
+if "bbox.xmin >= -90.3" in query:
+    print("✓ Using bbox row-group pruning filter")
 else:
-    print("✓ Not using old bbox metadata filtering")
+    print("✗ NOT pruning by bbox - every row group will be scanned!")
 
 print()
-print("Expected pattern: ST_Within(geometry, ST_MakeEnvelope(-90.3, 34.9, -81.6, 36.7))")
+print("Expected pattern: bbox.xmin >= -90.3 AND bbox.xmax <= -81.6 AND bbox.ymin >= 34.9 AND bbox.ymax <= 36.7")
+print("             and: ST_Within(geometry, ST_MakeEnvelope(-90.3, 34.9, -81.6, 36.7))")
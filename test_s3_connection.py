@@ -7,6 +7,8 @@ Run this script to diagnose connection issues
 import duckdb
 import time
 
+from src.constants import DUCKDB_SETTINGS
+
 def test_s3_connection():
     """Test basic S3 connectivity and query performance"""
     print("=" * 60)
@@ -34,6 +36,19 @@ def test_s3_connection():
         con.execute("SET s3_region='us-west-2'")
         print("   ✓ S3 region set to us-west-2")
 
+        # Match the app's scan settings (src/db_manager.py) so timings are
+        # comparable: cached Parquet footers and HTTP metadata, and more
+        # threads than cores since scans mostly wait on S3 range requests.
+        # DuckDB's default thread count follows the container's CPU quota
+        cores = con.execute("SELECT current_setting('threads')").fetchone()[0]
+        threads = min(cores * DUCKDB_SETTINGS['threads_per_core'], DUCKDB_SETTINGS['max_threads'])
+        preserve_order = str(DUCKDB_SETTINGS['preserve_insertion_order']).lower()
+        con.execute("SET parquet_metadata_cache=true")
+        con.execute("SET enable_http_metadata_cache=true")
+        con.execute(f"SET threads={threads}")
+        con.execute(f"SET preserve_insertion_order={preserve_order}")
+        print(f"   ✓ Scan settings applied ({threads} threads)")
+
         # Test S3 access
         print("\n4. Testing S3 connectivity...")
         release = "2026-01-21.0"
@@ -86,12 +101,15 @@ def test_s3_connection():
             print("\n   Sample results:")
             print(results[['name', 'category', 'state']].head(3).to_string(index=False))
 
-        # Test spatial query with bounding box
+        # Test spatial query with bounding box. The bbox comparisons let the
+        # scan skip row groups by their min/max stats; ST_Within is exact
         print("\n7. Testing spatial query (ST_Within)...")
         bbox_query = """
         SELECT COUNT(*) as count
         FROM places
         WHERE categories.primary IN ('hospital')
+          AND bbox.xmin >= -90.3 AND bbox.xmax <= -81.6
+          AND bbox.ymin >= 34.9 AND bbox.ymax <= 36.7
           AND ST_Within(geometry, ST_MakeEnvelope(-90.3, 34.9, -81.6, 36.7))
         """
 
@@ -2,24 +2,83 @@
 Unit tests for DuckDB manager
 """
 
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import duckdb
 import pytest
+import pandas as pd
+import pyarrow as pa
 from unittest.mock import Mock, patch, MagicMock
-from src.db_manager import DuckDBManager
+from src.constants import OVERTURE_CONFIG
+from src.db_manager import DuckDBManager, fetch_dataframe
+from src.query_builder import OvertureQueryBuilder, places_view_name
+
+# View the manager and builder use for the default release
+VIEW = places_view_name(OVERTURE_CONFIG['release'])
+
+
+def mock_connection(default_threads=2):
+    """Mock DuckDB connection reporting the given default thread count"""
+    con = Mock()
+    con.execute.return_value.fetchone.return_value = (default_threads,)
+    return con
+
+
+@pytest.fixture
+def places_db(tmp_path):
+    """
+    Manager on an in-memory DuckDB with a local places view
+
+    The Parquet file mirrors the Overture struct columns the queries touch
+    (minus geometry, which needs the spatial extension), so SQL runs for real
+    without S3.
+    """
+    path = tmp_path / 'places.parquet'
+    con = duckdb.connect(':memory:')
+    con.execute(f"""
+        COPY (
+            SELECT * FROM (VALUES
+                ('id1', {{'primary': 'Memphis Clinic'}}, {{'primary': 'hospital'}},
+                 [{{'region': 'TN', 'locality': 'Memphis'}}],
+                 {{'xmin': -90.05, 'xmax': -90.05, 'ymin': 35.15, 'ymax': 35.15}}),
+                ('id2', {{'primary': 'Nashville General'}}, {{'primary': 'hospital'}},
+                 [{{'region': 'TN', 'locality': 'Nashville'}}],
+                 {{'xmin': -86.78, 'xmax': -86.78, 'ymin': 36.16, 'ymax': 36.16}}),
+                ('id3', {{'primary': 'Corner Pharmacy'}}, {{'primary': 'pharmacy'}},
+                 [{{'region': 'TN', 'locality': 'Nashville'}}],
+                 {{'xmin': -86.77, 'xmax': -86.77, 'ymin': 36.15, 'ymax': 36.15}}),
+                ('id4', {{'primary': 'LA Medical'}}, {{'primary': 'hospital'}},
+                 [{{'region': 'CA', 'locality': 'Los Angeles'}}],
+                 {{'xmin': -118.24, 'xmax': -118.24, 'ymin': 34.05, 'ymax': 34.05}})
+            ) AS t(id, names, categories, addresses, bbox)
+        ) TO '{path}' (FORMAT PARQUET)
+    """)
+    con.execute(f"CREATE VIEW {VIEW} AS SELECT * FROM read_parquet('{path}')")
+
+    manager = DuckDBManager()
+    manager._connection = con
+    manager._view_releases = {OVERTURE_CONFIG['release']}
+    yield manager
+    manager.close_connection()
 
 
 class TestDuckDBManager:
     """Test DuckDB manager functionality"""
 
-    def test_singleton_pattern(self):
-        """Verify only one instance is created"""
+    def test_instances_are_independent(self):
+        """Each manager owns its own connection state"""
         manager1 = DuckDBManager()
         manager2 = DuckDBManager()
-        assert manager1 is manager2
+        manager1._view_releases.add("2026-01-21.0")
+
+        assert manager1 is not manager2
+        assert manager2._view_releases == set()
 
     @patch('src.db_manager.duckdb.connect')
     def test_initialize_connection(self, mock_connect):
         """Test connection initialization"""
-        mock_con = Mock()
+        mock_con = mock_connection()
         mock_connect.return_value = mock_con
 
         manager = DuckDBManager()
@@ -34,6 +93,59 @@ class TestDuckDBManager:
         assert any('httpfs' in str(call) for call in execute_calls)
         assert any('spatial' in str(call) for call in execute_calls)
 
+        # Parquet footers are cached across the view bind and later queries
+        assert any('parquet_metadata_cache=true' in str(call) for call in execute_calls)
+        assert any('enable_external_file_cache=true' in str(call) for call in execute_calls)
+
+        # Remote scans run more threads than cores and may return rows unordered
+        assert any('SET GLOBAL threads=8' in str(call) for call in execute_calls)
+        assert any('preserve_insertion_order=false' in str(call) for call in execute_calls)
+
+    @patch('src.db_manager.duckdb.connect')
+    def test_thread_count_capped(self, mock_connect):
+        """Scaling DuckDB's default thread count stops at the configured cap"""
+        mock_con = mock_connection(default_threads=64)
+        mock_connect.return_value = mock_con
+
+        DuckDBManager().get_connection()
+
+        execute_calls = [call[0][0] for call in mock_con.execute.call_args_list]
+        assert "SET GLOBAL threads=64" in execute_calls
+
+    @patch('src.db_manager.duckdb.connect')
+    def test_initialize_without_external_file_cache(self, mock_connect):
+        """DuckDB releases before 1.3 lack the external file cache settings"""
+        mock_con = mock_connection()
+        result = mock_con.execute.return_value
+
+        def execute(sql, *args):
+            if 'external_file_cache' in sql:
+                raise duckdb.CatalogException("unrecognized configuration parameter")
+            return result
+        mock_con.execute.side_effect = execute
+        mock_connect.return_value = mock_con
+
+        manager = DuckDBManager()
+
+        assert manager.get_connection() is mock_con
+        execute_calls = [call[0][0] for call in mock_con.execute.call_args_list]
+        assert any('SET GLOBAL threads=' in sql for sql in execute_calls)
+
+    @patch('src.db_manager.duckdb.connect')
+    def test_concurrent_first_use_connects_once(self, mock_connect):
+        """Threads racing on first use share one initialized connection"""
+        def slow_connect():
+            time.sleep(0.05)
+            return mock_connection()
+        mock_connect.side_effect = slow_connect
+
+        manager = DuckDBManager()
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            connections = list(pool.map(lambda _: manager.get_connection(), range(4)))
+
+        assert mock_connect.call_count == 1
+        assert all(con is connections[0] for con in connections)
+
     @patch('src.db_manager.duckdb.connect')
     def test_create_places_view_default_release(self, mock_connect):
         """Test view creation with default release"""
@@ -42,8 +154,6 @@ class TestDuckDBManager:
 
         manager = DuckDBManager()
         manager._connection = mock_con
-        manager._view_created = False
-        manager._current_release = None
 
         manager.create_places_view()
 
@@ -53,7 +163,7 @@ class TestDuckDBManager:
 
         # Check that CREATE VIEW was called
         assert any('CREATE' in str(call) and 'places' in str(call) for call in execute_calls)
-        assert manager._view_created is True
+        assert manager.is_view_current() is True
 
     @patch('src.db_manager.duckdb.connect')
     def test_create_places_view_custom_release(self, mock_connect):
@@ -63,8 +173,6 @@ class TestDuckDBManager:
 
         manager = DuckDBManager()
         manager._connection = mock_con
-        manager._view_created = False
-        manager._current_release = None
 
         custom_release = "2026-02-15.0"
         manager.create_places_view(release_version=custom_release)
@@ -74,26 +182,26 @@ class TestDuckDBManager:
 
         # Check that custom release is in the path
         assert any(custom_release in str(call) for call in execute_calls)
-        assert manager._current_release == custom_release
+        assert manager.is_view_current(custom_release) is True
 
     @patch('src.db_manager.duckdb.connect')
-    def test_view_recreation_on_release_change(self, mock_connect):
-        """Test that view is recreated when release changes"""
+    def test_view_per_release(self, mock_connect):
+        """A new release gets its own view; the existing one is left alone"""
         mock_con = Mock()
         mock_connect.return_value = mock_con
 
         manager = DuckDBManager()
         manager._connection = mock_con
-        manager._view_created = True
-        manager._current_release = "2026-01-21.0"
+        manager._view_releases = {"2026-01-21.0"}
 
         # Change to different release
         new_release = "2026-02-15.0"
         manager.create_places_view(release_version=new_release)
 
-        # Should recreate view
-        assert mock_con.execute.called
-        assert manager._current_release == new_release
+        sql = mock_con.execute.call_args[0][0]
+        assert 'VIEW "places_2026-02-15.0"' in sql
+        assert manager.is_view_current(new_release) is True
+        assert manager.is_view_current("2026-01-21.0") is True
 
     @patch('src.db_manager.duckdb.connect')
     def test_view_not_recreated_same_release(self, mock_connect):
@@ -103,8 +211,7 @@ class TestDuckDBManager:
 
         manager = DuckDBManager()
         manager._connection = mock_con
-        manager._view_created = True
-        manager._current_release = "2026-01-21.0"
+        manager._view_releases = {"2026-01-21.0"}
 
         # Clear call history
         mock_con.execute.reset_mock()
@@ -115,46 +222,93 @@ class TestDuckDBManager:
         # Should NOT execute any queries
         assert not mock_con.execute.called
 
+    def test_is_view_current(self):
+        """Test view freshness check against the requested release"""
+        manager = DuckDBManager()
+        assert manager.is_view_current("2026-01-21.0") is False
+
+        manager._view_releases = {"2026-01-21.0"}
+        assert manager.is_view_current("2026-01-21.0") is True
+        assert manager.is_view_current("2026-02-15.0") is False
+
     @patch('src.db_manager.duckdb.connect')
     def test_execute_query_with_release(self, mock_connect):
         """Test query execution with custom release"""
         mock_con = Mock()
         mock_result = Mock()
-        mock_result.fetchdf.return_value = "mock_dataframe"
-        mock_con.execute.return_value = mock_result
+        mock_result.to_arrow_reader.return_value = pa.table({'name': ['Clinic']}).to_reader()
+        mock_con.cursor.return_value.execute.return_value = mock_result
         mock_connect.return_value = mock_con
 
         manager = DuckDBManager()
         manager._connection = mock_con
-        manager._view_created = False
 
         custom_release = "2026-02-15.0"
-        query = "SELECT * FROM places LIMIT 10"
+        query = 'SELECT * FROM "places_2026-02-15.0" LIMIT 10'
 
         result = manager.execute_query(query, release_version=custom_release)
 
         # Should create view with custom release
-        assert manager._current_release == custom_release
-        assert result == "mock_dataframe"
+        assert manager.is_view_current(custom_release) is True
+        assert list(result['name']) == ['Clinic']
+        # The query ran on its own cursor, which is closed afterwards
+        mock_con.cursor.return_value.close.assert_called_once()
 
     @patch('src.db_manager.duckdb.connect')
     def test_execute_count_query_with_release(self, mock_connect):
         """Test count query execution with custom release"""
         mock_con = Mock()
-        mock_con.execute.return_value.fetchone.return_value = (42,)
+        mock_con.cursor.return_value.execute.return_value.fetchone.return_value = (42,)
         mock_connect.return_value = mock_con
 
         manager = DuckDBManager()
         manager._connection = mock_con
-        manager._view_created = False
 
         custom_release = "2026-02-15.0"
-        query = "SELECT * FROM places"
+        query = 'SELECT * FROM "places_2026-02-15.0"'
 
         count = manager.execute_count_query(query, release_version=custom_release)
 
         assert count == 42
-        assert manager._current_release == custom_release
+        assert manager.is_view_current(custom_release) is True
+
+    def test_execute_count_query_binds_params(self, places_db):
+        """Placeholder values are bound by DuckDB alongside the SQL"""
+        query = f"SELECT * FROM {VIEW} WHERE addresses[1].region = ?"
+
+        assert places_db.execute_count_query(query, params=['TN']) == 3
+        assert places_db.execute_count_query(query, params=['CA']) == 1
+
+    def test_execute_count_query_ceiling(self, places_db):
+        """A ceiling stops the count one row past it"""
+        query = f"SELECT * FROM {VIEW}"
+
+        assert places_db.execute_count_query(query, ceiling=1) == 2
+        assert places_db.execute_count_query(query, ceiling=10) == 4
+        assert places_db.execute_count_query(query) == 4
+
+    def test_execute_query_returns_rows(self, places_db):
+        """Struct fields come back as named DataFrame columns"""
+        result = places_db.execute_query(
+            "SELECT id, names.primary AS name, addresses[1].locality AS city "
+            f"FROM {VIEW} WHERE categories.primary = 'pharmacy'"
+        )
+
+        assert result.to_dict('records') == [{'id': 'id3', 'name': 'Corner Pharmacy', 'city': 'Nashville'}]
+
+    def test_builder_count_query_runs(self, places_db):
+        """Parameterized builder SQL binds and filters against the Overture schema"""
+        con = places_db.get_connection()
+
+        builder = OvertureQueryBuilder().add_categories(['hospital']).add_state_filter('TN')
+        sql, params = builder.build_count_query_parameterized()
+        assert con.execute(sql, params).fetchone()[0] == 2
+
+        # CA adds the padded state bbox hint on top of the region filter
+        builder = OvertureQueryBuilder().add_categories(['hospital']).add_state_filter('CA')
+        sql, params = builder.build_count_query_parameterized()
+        assert "bbox.xmin" in sql
+        assert con.execute(sql, params).fetchone()[0] == 1
 
     @patch('src.db_manager.duckdb.connect')
     def test_connection_error_handling(self, mock_connect):
@@ -176,24 +330,14 @@ class TestDuckDBManager:
 
         manager = DuckDBManager()
         manager._connection = mock_con
-        manager._view_created = False
 
         with pytest.raises(Exception, match="Failed to create places view"):
             manager.create_places_view()
 
-    @patch('src.db_manager.duckdb.connect')
-    def test_query_execution_error_handling(self, mock_connect):
+    def test_query_execution_error_handling(self, places_db):
         """Test error handling on query execution failure"""
-        mock_con = Mock()
-        mock_con.execute.side_effect = Exception("Query syntax error")
-        mock_connect.return_value = mock_con
-
-        manager = DuckDBManager()
-        manager._connection = mock_con
-        manager._view_created = True
-
         with pytest.raises(Exception, match="Query execution failed"):
-            manager.execute_query("INVALID SQL")
+            places_db.execute_query("INVALID SQL")
 
     @patch('src.db_manager.duckdb.connect')
     def test_close_connection(self, mock_connect):
@@ -203,46 +347,85 @@ class TestDuckDBManager:
 
         manager = DuckDBManager()
         manager._connection = mock_con
-        manager._view_created = True
-        manager._current_release = "2026-01-21.0"
+        manager._view_releases = {"2026-01-21.0"}
 
         manager.close_connection()
 
         assert mock_con.close.called
         assert manager._connection is None
-        assert manager._view_created is False
+        assert manager.is_view_current("2026-01-21.0") is False
 
 
-class TestGetDBManager:
-    """Test the get_db_manager helper function"""
+class TestFetchDataFrame:
+    """Test Arrow-based result materialization"""
 
-    @patch('src.db_manager.st')
-    def test_creates_manager_if_not_exists(self, mock_st):
-        """Test that manager is created if not in session state"""
-        # Create a mock that acts like a dict but supports attribute access
-        session_state_mock = Mock()
-        session_state_mock.__contains__ = Mock(return_value=False)
-        mock_st.session_state = session_state_mock
+    def test_strings_stay_arrow_backed(self):
+        """String columns use pyarrow storage, numerics stay NumPy"""
+        mock_result = Mock()
+        mock_result.to_arrow_reader.return_value = pa.table({
+            'name': ['Clinic', None],
+            'latitude': [35.1, 36.2]
+        }).to_reader()
 
-        from src.db_manager import get_db_manager
-        manager = get_db_manager()
+        df = fetch_dataframe(mock_result)
 
-        # Verify db_manager was set
-        assert hasattr(session_state_mock, 'db_manager')
-        assert isinstance(manager, DuckDBManager)
+        assert df['name'].dtype == pd.StringDtype("pyarrow")
+        assert df['latitude'].dtype == 'float64'
+        assert df['name'].isna().tolist() == [False, True]
+
+    def test_repetitive_columns_become_categorical(self):
+        """Category, state and city are categoricals; other text stays string"""
+        mock_result = Mock()
+        mock_result.to_arrow_reader.return_value = pa.table({
+            'name': ['Clinic', 'Pharmacy', 'Clinic'],
+            'category': ['hospital', None, 'hospital'],
+            'state': ['TN', 'TN', 'TN'],
+        }).to_reader()
+
+        df = fetch_dataframe(mock_result)
+
+        assert isinstance(df['category'].dtype, pd.CategoricalDtype)
+        assert isinstance(df['state'].dtype, pd.CategoricalDtype)
+        assert df['name'].dtype == pd.StringDtype("pyarrow")
+        assert df['category'].isna().tolist() == [False, True, False]
+        assert df['category'].value_counts().to_dict() == {'hospital': 2}
+
+    def test_reports_progress_per_batch(self):
+        """Running row count is reported as each batch arrives"""
+        table = pa.table({'name': ['a', 'b', 'c', 'd', 'e']})
+        mock_result = Mock()
+        mock_result.to_arrow_reader.return_value = pa.RecordBatchReader.from_batches(
+            table.schema, table.to_batches(max_chunksize=2)
+        )
+        progress = []
+
+        df = fetch_dataframe(mock_result, batch_size=2, on_progress=progress.append)
 
-    @patch('src.db_manager.st')
-    def test_returns_existing_manager(self, mock_st):
-        """Test that existing manager is returned"""
-        existing_manager = DuckDBManager()
+        mock_result.to_arrow_reader.assert_called_once_with(2)
+        assert progress == [2, 4, 5]
+        assert len(df) == 5
+
+    def test_empty_result_keeps_columns(self):
+        """An empty result still produces the expected columns"""
+        schema = pa.schema([('name', pa.string())])
+        mock_result = Mock()
+        mock_result.to_arrow_reader.return_value = pa.RecordBatchReader.from_batches(schema, [])
 
-        # Create a mock that acts like a dict but supports attribute access
-        session_state_mock = Mock()
-        session_state_mock.__contains__ = Mock(return_value=True)
-        session_state_mock.db_manager = existing_manager
-        mock_st.session_state = session_state_mock
+        df = fetch_dataframe(mock_result)
 
+        assert df.empty
+        assert list(df.columns) == ['name']
+
+
+class TestGetDBManager:
+    """Test the get_db_manager helper function"""
+
+    def test_returns_shared_manager(self):
+        """One cached manager serves every caller"""
         from src.db_manager import get_db_manager
+        get_db_manager.clear()
+
         manager = get_db_manager()
 
-        assert manager is existing_manager
+        assert isinstance(manager, DuckDBManager)
+        assert get_db_manager() is manager
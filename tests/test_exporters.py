@@ -4,13 +4,18 @@ Unit tests for data exporters
 
 import pytest
 import pandas as pd
+import geopandas as gpd
+import pyarrow.parquet as pq
 import io
 import json
+import zipfile
 from src.exporters import (
     CSVExporter,
     GeoJSONExporter,
+    GeoJSONSeqExporter,
     KMLExporter,
     ParquetExporter,
+    ShapefileExporter,
     ExporterFactory,
     export_dataframe
 )
@@ -44,13 +49,38 @@ class TestCSVExporter:
         buffer = io.BytesIO()
 
         exporter.export(sample_dataframe, buffer)
-        buffer.seek(0)
 
-        # Read back and verify
+        # Header plus one line per row, checked on the raw bytes
+        lines = buffer.getvalue().splitlines()
+        assert len(lines) == 4
+        header = lines[0].decode('utf-8').replace('"', '').split(',')
+        assert 'name' in header
+        assert 'longitude' in header
+
+    def test_csv_quotes_and_nulls(self):
+        """Embedded quotes, commas and newlines round-trip; nulls stay empty"""
+        df = pd.DataFrame({
+            'name': ['He said "hi", ok\nnext', None],
+            'latitude': [35.15, None]
+        })
+        buffer = io.BytesIO()
+
+        CSVExporter().export(df, buffer)
+
         result = pd.read_csv(buffer)
-        assert len(result) == 3
-        assert 'name' in result.columns
-        assert 'longitude' in result.columns
+        assert result['name'].iloc[0] == df['name'].iloc[0]
+        assert result['name'].isna().tolist() == [False, True]
+        assert result['latitude'].isna().tolist() == [False, True]
+
+    def test_csv_streams_in_chunks(self, sample_dataframe, monkeypatch):
+        """Header is written once however many chunks the rows span"""
+        monkeypatch.setattr('src.exporters.EXPORT_CHUNK_ROWS', 2)
+        buffer = io.BytesIO()
+
+        CSVExporter().export(sample_dataframe, buffer)
+
+        result = pd.read_csv(buffer)
+        assert result['id'].tolist() == ['id1', 'id2', 'id3']
 
     def test_csv_mime_type(self):
         exporter = CSVExporter()
@@ -153,6 +183,70 @@ class TestGeoJSONExporter:
         # Should only have 1 feature (second one skipped due to missing lon)
         assert len(geojson['features']) == 1
 
+    def test_geojson_streams_in_chunks(self, sample_dataframe, monkeypatch):
+        """Chunked writing produces the same document as a single chunk"""
+        buffer = io.BytesIO()
+        GeoJSONExporter().export(sample_dataframe, buffer)
+        single = buffer.getvalue()
+
+        monkeypatch.setattr('src.exporters.EXPORT_CHUNK_ROWS', 2)
+        buffer = io.BytesIO()
+        GeoJSONExporter().export(sample_dataframe, buffer)
+
+        assert buffer.getvalue() == single
+        assert len(json.loads(single)['features']) == 3
+
+    def test_geojson_missing_values_are_null(self):
+        """Null text values and absent columns export as null properties"""
+        df = pd.DataFrame({
+            'id': ['id1'],
+            'name': pd.array([None], dtype='string[pyarrow]'),
+            'category': pd.Categorical(['hospital']),
+            'longitude': [-90.05],
+            'latitude': [35.15]
+        })
+
+        exporter = GeoJSONExporter()
+        buffer = io.BytesIO()
+
+        exporter.export(df, buffer)
+        buffer.seek(0)
+
+        properties = json.loads(buffer.read().decode('utf-8'))['features'][0]['properties']
+        assert properties == {
+            'id': 'id1', 'name': None, 'category': 'hospital', 'state': None, 'city': None
+        }
+
+
+class TestGeoJSONSeqExporter:
+    """Test GeoJSON text sequence export functionality"""
+
+    def test_geojsonseq_records(self, sample_dataframe, monkeypatch):
+        """One RS-prefixed feature per line, matching the FeatureCollection features"""
+        monkeypatch.setattr('src.exporters.EXPORT_CHUNK_ROWS', 2)
+        buffer = io.BytesIO()
+        GeoJSONSeqExporter().export(sample_dataframe, buffer)
+
+        records = buffer.getvalue().split(b'\n')
+        assert records[-1] == b''
+        assert all(record.startswith(b'\x1e') for record in records[:-1])
+        features = [json.loads(record[1:]) for record in records[:-1]]
+
+        collection = io.BytesIO()
+        GeoJSONExporter().export(sample_dataframe, collection)
+        assert features == json.loads(collection.getvalue())['features']
+
+    def test_geojsonseq_empty(self, empty_dataframe):
+        buffer = io.BytesIO()
+        GeoJSONSeqExporter().export(empty_dataframe, buffer)
+        assert buffer.getvalue() == b''
+
+    def test_geojsonseq_format(self):
+        exporter = ExporterFactory.get_exporter('geojsonseq')
+        assert isinstance(exporter, GeoJSONSeqExporter)
+        assert exporter.get_mime_type() == 'application/geo+json-seq'
+        assert exporter.get_file_extension() == 'geojsons'
+
 
 class TestKMLExporter:
     """Test KML export functionality"""
@@ -254,6 +348,40 @@ class TestKMLExporter:
         # Should only have 1 placemark
         assert content.count('<Placemark>') == 1
 
+    def test_kml_streams_in_chunks(self, sample_dataframe, monkeypatch):
+        """Chunked writing produces the same document as a single chunk"""
+        buffer = io.BytesIO()
+        KMLExporter().export(sample_dataframe, buffer)
+        single = buffer.getvalue()
+
+        monkeypatch.setattr('src.exporters.EXPORT_CHUNK_ROWS', 2)
+        buffer = io.BytesIO()
+        KMLExporter().export(sample_dataframe, buffer)
+
+        assert buffer.getvalue() == single
+        assert single.count(b'<Placemark>') == 3
+
+    def test_kml_missing_values_use_defaults(self):
+        """Null names and absent columns fall back to the default labels"""
+        df = pd.DataFrame({
+            'id': ['id1'],
+            'name': pd.array([None], dtype='string[pyarrow]'),
+            'category': ['hospital'],
+            'longitude': [-90.05],
+            'latitude': [35.15]
+        })
+
+        exporter = KMLExporter()
+        buffer = io.BytesIO()
+
+        exporter.export(df, buffer)
+        buffer.seek(0)
+
+        content = buffer.read().decode('utf-8')
+
+        assert '<name>Unknown</name>' in content
+        assert '<b>City:</b> N/A' in content
+
 
 class TestParquetExporter:
     """Test Parquet export functionality"""
@@ -263,12 +391,11 @@ class TestParquetExporter:
         buffer = io.BytesIO()
 
         exporter.export(sample_dataframe, buffer)
-        buffer.seek(0)
 
-        # Read back and verify
-        result = pd.read_parquet(buffer)
-        assert len(result) == 3
-        assert 'name' in result.columns
+        # Row count and columns come from the footer; no need to decode data
+        metadata = pq.read_metadata(buffer)
+        assert metadata.num_rows == 3
+        assert 'name' in metadata.schema.names
 
     def test_parquet_mime_type(self):
         exporter = ParquetExporter()
@@ -290,6 +417,50 @@ class TestParquetExporter:
         # Longitude should still be float
         assert result['longitude'].dtype == 'float64'
 
+    def test_parquet_compression_settings(self, sample_dataframe):
+        """Defaults to zstd; codec and row group size are configurable"""
+        buffer = io.BytesIO()
+        ParquetExporter().export(sample_dataframe, buffer)
+        metadata = pq.ParquetFile(buffer).metadata
+        assert metadata.row_group(0).column(0).compression == 'ZSTD'
+
+        buffer = io.BytesIO()
+        ParquetExporter(compression='snappy', compression_level=None, row_group_size=2).export(
+            sample_dataframe, buffer
+        )
+        metadata = pq.ParquetFile(buffer).metadata
+        assert metadata.row_group(0).column(0).compression == 'SNAPPY'
+        assert metadata.num_row_groups == 2
+
+
+class TestShapefileExporter:
+    """Test zipped shapefile export functionality"""
+
+    def test_shapefile_zip_contents(self, sample_dataframe):
+        """Every shapefile component is bundled under the export name"""
+        exporter = ShapefileExporter()
+        buffer = io.BytesIO()
+
+        exporter.export(sample_dataframe, buffer)
+
+        with zipfile.ZipFile(buffer) as zipf:
+            names = set(zipf.namelist())
+        assert {'export.shp', 'export.shx', 'export.dbf', 'export.prj'} <= names
+
+    def test_shapefile_exports_are_independent(self, sample_dataframe):
+        """Each export writes its own components instead of a shared path"""
+        exporter = ShapefileExporter()
+        first, second = io.BytesIO(), io.BytesIO()
+
+        exporter.export(sample_dataframe, first)
+        exporter.export(sample_dataframe.iloc[:1], second)
+
+        result = gpd.read_file(first)
+        assert len(result) == 3
+        assert result.crs.to_epsg() == 4326
+        assert result.geometry.iloc[0].x == pytest.approx(-90.05)
+        assert len(gpd.read_file(second)) == 1
+
 
 class TestExporterFactory:
     """Test exporter factory"""
@@ -315,6 +486,11 @@ class TestExporterFactory:
         exporter2 = ExporterFactory.get_exporter('csv')
         assert type(exporter1) == type(exporter2)
 
+    def test_exporter_instances_are_reused(self):
+        """Exporters are stateless, so each format returns one shared instance"""
+        assert ExporterFactory.get_exporter('CSV') is ExporterFactory.get_exporter('csv')
+        assert ExporterFactory.get_exporter('kml') is not ExporterFactory.get_exporter('csv')
+
     def test_unsupported_format(self):
         with pytest.raises(ValueError, match="Unsupported export format"):
             ExporterFactory.get_exporter('pdf')
@@ -368,3 +544,12 @@ class TestExportDataFrame:
         # Verify it can be read back
         result = pd.read_parquet(buffer)
         assert len(result) == 3
+
+    def test_large_export_spills_to_disk(self, sample_dataframe, monkeypatch):
+        """Exports past the spool size roll over to a temp file with the same content"""
+        monkeypatch.setattr('src.exporters.SPOOL_MAX_SIZE', 16)
+
+        buffer, _, _ = export_dataframe(sample_dataframe, 'csv')
+
+        assert buffer._rolled
+        assert pd.read_csv(buffer)['name'].tolist() == ['Place 1', 'Place 2', 'Place 3']
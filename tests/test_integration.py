@@ -6,7 +6,7 @@ These tests are slower as they hit the actual S3 data source
 import pytest
 import pandas as pd
 from src.db_manager import DuckDBManager
-from src.query_builder import OvertureQueryBuilder
+from src.query_builder import OvertureQueryBuilder, places_view_name
 from src.constants import OVERTURE_CONFIG
 
 
@@ -62,7 +62,7 @@ class TestOvertureDataConnection:
 
         # Try a very simple query to verify we can read the data
         # Limit to 1 row to make it fast
-        query = "SELECT COUNT(*) as count FROM places LIMIT 1"
+        query = f"SELECT COUNT(*) as count FROM {places_view_name(OVERTURE_CONFIG['release'])} LIMIT 1"
 
         result = connection.execute(query).fetchone()
         assert result is not None
@@ -138,8 +138,7 @@ class TestOvertureDataConnection:
 
         db_manager.create_places_view(release_version=custom_release)
 
-        assert db_manager._current_release == custom_release
-        assert db_manager._view_created is True
+        assert db_manager.is_view_current(custom_release) is True
 
     def test_geometry_extraction(self, db_manager):
         """Test that geometries are correctly extracted to lon/lat"""
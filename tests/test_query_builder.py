@@ -3,7 +3,11 @@ Unit tests for query builder
 """
 
 import pytest
-from src.query_builder import OvertureQueryBuilder, build_query_from_params
+from src.constants import OVERTURE_CONFIG
+from src.query_builder import OvertureQueryBuilder, QueryParams, build_query_from_params
+
+# View the builder targets when no release is set
+DEFAULT_VIEW = '"places_' + OVERTURE_CONFIG['release'] + '"'
 
 
 class TestQueryBuilder:
@@ -17,7 +21,7 @@ class TestQueryBuilder:
 
         assert "addresses[1].region = 'TN'" in query
         assert "categories.primary IN ('hospital')" in query
-        assert "FROM places" in query
+        assert f"FROM {DEFAULT_VIEW}" in query
 
     def test_bbox_filter(self):
         builder = OvertureQueryBuilder()
@@ -29,6 +33,15 @@ class TestQueryBuilder:
         assert "ST_Within(geometry, ST_MakeEnvelope(-90.3, 34.9, -81.6, 36.7))" in query
         assert "categories.primary IN ('clinic')" in query
 
+    def test_bbox_pruning_predicate(self):
+        """Bbox struct comparisons are emitted so Parquet stats can prune"""
+        builder = OvertureQueryBuilder()
+        builder.add_bbox_filter(-90.3, -81.6, 34.9, 36.7)
+        query = builder.build()
+
+        assert "bbox.xmin >= -90.3 AND bbox.xmax <= -81.6" in query
+        assert "bbox.ymin >= 34.9 AND bbox.ymax <= 36.7" in query
+
     def test_multiple_categories(self):
         builder = OvertureQueryBuilder()
         builder.add_categories(['hospital', 'clinic', 'pharmacy'])
@@ -39,6 +52,15 @@ class TestQueryBuilder:
         assert "'pharmacy'" in query
         assert "categories.primary IN" in query
 
+    def test_duplicate_categories_dropped(self):
+        builder = OvertureQueryBuilder()
+        builder.add_categories(['hospital', 'clinic', 'hospital'])
+        sql, params = builder.build_parameterized()
+
+        assert builder.categories == ['hospital', 'clinic']
+        assert "categories.primary IN (?, ?)" in sql
+        assert params == ['hospital', 'clinic']
+
     def test_with_limit(self):
         builder = OvertureQueryBuilder()
         builder.add_state_filter('CA')
@@ -68,9 +90,78 @@ class TestQueryBuilder:
         query = builder.build_count_query()
 
         assert "SELECT COUNT(*)" in query
-        assert "FROM places" in query
+        assert f"FROM {DEFAULT_VIEW}" in query
         assert "addresses[1].region = 'TN'" in query
 
+    def test_state_pruning_hint(self):
+        """States with a full extent get padded bbox bounds next to the region filter"""
+        builder = OvertureQueryBuilder()
+        builder.add_state_filter('CA')
+        sql, params = builder.build_parameterized()
+
+        assert "addresses[1].region = ?" in sql
+        assert "bbox.xmin >= ? AND bbox.xmax <= ?" in sql
+        assert params == ['CA', -124.9, -113.6, 32.0, 42.5]
+
+        # TN's entry is only the Nashville area, so it must not narrow the scan
+        assert "bbox.xmin" not in OvertureQueryBuilder().add_state_filter('TN').build()
+        # HI's entry stops short of the Northwestern Hawaiian Islands
+        assert "bbox.xmin" not in OvertureQueryBuilder().add_state_filter('HI').build()
+
+    def test_require_coordinates(self):
+        """Coordinate filter should apply to both data and count queries"""
+        builder = OvertureQueryBuilder()
+        builder.add_state_filter('TN')
+        builder.require_coordinates()
+
+        assert "geometry IS NOT NULL" in builder.build()
+        assert "geometry IS NOT NULL" in builder.build_count_query()
+        assert "geometry IS NOT NULL" not in OvertureQueryBuilder().build()
+
+    def test_parameterized_query(self):
+        """Filter values should be bound, not spliced into the SQL"""
+        builder = OvertureQueryBuilder()
+        builder.add_state_filter('TN')
+        builder.add_categories(['hospital', 'clinic'])
+        builder.set_limit(50)
+        sql, params = builder.build_parameterized()
+
+        assert "categories.primary IN (?, ?)" in sql
+        assert "addresses[1].region = ?" in sql
+        assert "LIMIT ?" in sql
+        assert "'TN'" not in sql
+        assert params == ['hospital', 'clinic', 'TN', 50]
+
+    def test_parameterized_count_query(self):
+        """Count query binds the same values as the data query, minus LIMIT"""
+        builder = OvertureQueryBuilder()
+        builder.add_state_filter('TN')
+        builder.add_categories(['hospital'])
+        builder.set_limit(50)
+        sql, params = builder.build_count_query_parameterized()
+
+        assert sql.startswith(f"SELECT COUNT(*) as count FROM {DEFAULT_VIEW}")
+        assert "'TN'" not in sql
+        assert "LIMIT" not in sql
+        assert params == ['hospital', 'TN']
+
+    def test_parameterized_bbox_order(self):
+        """Pruning bounds come first, then ST_MakeEnvelope(xmin, ymin, xmax, ymax)"""
+        builder = OvertureQueryBuilder()
+        builder.add_bbox_filter(-90.3, -81.6, 34.9, 36.7)
+        sql, params = builder.build_parameterized()
+
+        assert "bbox.xmin >= ? AND bbox.xmax <= ? AND bbox.ymin >= ? AND bbox.ymax <= ?" in sql
+        assert "ST_Within(geometry, ST_MakeEnvelope(?, ?, ?, ?))" in sql
+        assert params == [-90.3, -81.6, 34.9, 36.7, -90.3, 34.9, -81.6, 36.7]
+
+    def test_parameterized_matches_inline_shape(self):
+        """No filters means no WHERE and no parameters"""
+        sql, params = OvertureQueryBuilder().build_parameterized()
+
+        assert "WHERE" not in sql
+        assert params == []
+
     def test_reset(self):
         builder = OvertureQueryBuilder()
         builder.add_state_filter('TN')
@@ -83,6 +174,7 @@ class TestQueryBuilder:
         assert builder.bbox_filter is None
         assert builder.categories == []
         assert builder.limit is None
+        assert builder.coordinates_required is False
 
     def test_method_chaining(self):
         """Test that builder methods can be chained"""
@@ -102,7 +194,7 @@ class TestQueryBuilder:
         query = builder.build()
 
         assert "SELECT" in query
-        assert "FROM places" in query
+        assert f"FROM {DEFAULT_VIEW}" in query
         # Should not have WHERE clause
         assert query.count("WHERE") == 0
 
@@ -175,3 +267,59 @@ class TestBuildQueryFromParams:
         # Should build query without category filter
         assert "addresses[1].region = 'NY'" in query
         assert "categories.primary IN" not in query
+
+
+class TestQueryParams:
+    """Test frozen query parameter snapshots"""
+
+    def test_from_state_filters(self):
+        params = QueryParams.from_filters({
+            'filter_type': "State/Region",
+            'state': 'TN',
+            'bbox': None,
+            'categories': ['pharmacy', 'clinic'],
+            'limit': 500
+        }, release="2026-01-21.0")
+
+        assert params.categories == ('clinic', 'pharmacy')
+        assert params.state == 'TN'
+        assert params.bbox is None
+        assert params.limit == 500
+        assert params.release == "2026-01-21.0"
+
+    def test_from_map_filters_drops_state(self):
+        params = QueryParams.from_filters({
+            'filter_type': "Map Search",
+            'state': 'TN',
+            'bbox': {'xmin': -87.0, 'xmax': -86.5, 'ymin': 36.0, 'ymax': 36.3},
+            'categories': ['hospital'],
+            'limit': None
+        })
+
+        assert params.state is None
+        assert params.bbox == (-87.0, -86.5, 36.0, 36.3)
+        assert params.limit is None
+
+    def test_hashable_and_order_independent(self):
+        a = QueryParams.from_filters({'filter_type': "State/Region", 'state': 'TN',
+                                      'categories': ['b', 'a'], 'limit': 10})
+        b = QueryParams.from_filters({'filter_type': "State/Region", 'state': 'TN',
+                                      'categories': ['a', 'b'], 'limit': 10})
+
+        assert a == b
+        assert hash(a) == hash(b)
+
+    def test_to_builder(self):
+        query = QueryParams(categories=('hospital',), bbox=(-90.3, -81.6, 34.9, 36.7),
+                            limit=100).to_builder().build()
+
+        assert "ST_Within(geometry, ST_MakeEnvelope(-90.3, 34.9, -81.6, 36.7))" in query
+        assert "categories.primary IN ('hospital')" in query
+        assert "LIMIT 100" in query
+
+    def test_to_builder_uses_release_view(self):
+        """Each release's SQL names that release's own view"""
+        query = QueryParams(state='TN', release='2026-02-15.0').to_builder().build()
+
+        assert 'FROM "places_2026-02-15.0"' in query
+        assert DEFAULT_VIEW not in query
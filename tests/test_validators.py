@@ -2,6 +2,7 @@
 Unit tests for input validators
 """
 
+import numpy as np
 import pytest
 from src.validators import InputValidator, ValidationError
 
@@ -73,6 +74,29 @@ class TestBboxValidation:
         assert is_valid is False
         assert "too large" in msg.lower()
 
+    def test_nan_coordinate_rejected(self):
+        is_valid, msg = InputValidator.validate_bbox(float('nan'), -81.6, 34.9, 36.7)
+        assert is_valid is False
+        assert "longitude" in msg.lower()
+
+
+class TestBatchBboxValidation:
+    """Test vectorized bounding box validation"""
+
+    def test_mask_matches_single_validation(self):
+        bboxes = [
+            (-90.3, -81.6, 34.9, 36.7),   # valid
+            (-190.0, -81.6, 34.9, 36.7),  # longitude out of range
+            (-90.3, -81.6, 36.7, 34.9),   # ymin > ymax
+            (-120.0, -60.0, 20.0, 50.0),  # too large
+            (-90.3, -90.3, 34.9, 36.7),   # zero width
+        ]
+
+        mask = InputValidator.validate_bboxes(np.array(bboxes))
+
+        assert mask.tolist() == [InputValidator.validate_bbox(*b)[0] for b in bboxes]
+        assert mask.tolist() == [True, False, False, False, False]
+
 
 class TestCategoryValidation:
     """Test category name validation"""
@@ -108,6 +132,12 @@ class TestCategoryValidation:
         assert is_valid is False
         assert "can only contain" in msg.lower()
 
+    def test_category_trailing_newline_rejected(self):
+        """Every character is checked, including a trailing newline"""
+        is_valid, msg = InputValidator.validate_category('hospital\n')
+        assert is_valid is False
+        assert "can only contain" in msg.lower()
+
 
 class TestCategoriesListValidation:
     """Test category list validation"""